@@ -1,26 +1,120 @@
 """Clock section on the board
 
-- An astable multivibrator
+- An astable multivibrator, either driven edge by edge, or the analogue one:
+  a Schmitt-trigger inverter with an RC network
 """
 
-import asyncio
+import time
+import weakref
 
-# from boardsections.hardware.u1_7414 import SchmidtTrigger
+from boardsections.hardware.psu import Psu
 from boardsections.hardware.wiring import Wire
+from tools import stimulus
 from typedefinitions import TTL
 
 
+# The clocks (weakly referenced) in creation order, see clocks()
+_clocks: list[weakref.ref] = []
+
+
 class AstableMultivibrator:
     """Astable multivibrator creates the clock pulses"""
+    # Simulated time between the edges (seconds)
+    EDGE_INTERVAL = 1.0
+
     def __init__(self) -> None:
-        self.clock_level = TTL.L
         self.output = Wire("astabilmv_out")
+        self.edges = 0
+        _clocks.append(weakref.ref(self))
+
+    @property
+    def time(self) -> float:
+        """Simulated time of the last edge (seconds)"""
+        return self.edges * self.EDGE_INTERVAL
+
+    @property
+    def clock_level(self) -> TTL:
+        """The level is kept by the output wire only, so it is restorable"""
+        return self.output.current_level
+
+    @property
+    def next_level(self) -> TTL:
+        """The level of the next edge, the first one is low"""
+        return TTL.H if self.clock_level is TTL.L else TTL.L
+
+    def edge(self, level: TTL) -> None:
+        """Drive the clock output to the level"""
+        stimulus.record(stimulus.CLOCK, level.value)
+        self.edges += 1
+        self.output.set_output_level(level)
+        stimulus.checkpoint()
 
     async def run(self):
+        """Drive the edges, following the real time with the simulated one"""
+        import asyncio
+
+        start = time.monotonic() - self.time
         while True:
-            self.output.set_output_level(self.clock_level)
-            if self.clock_level == TTL.L:
-                print("-----------------")  # clock cycle separator
-            await asyncio.sleep(1.0)
-            self.clock_level = ~self.clock_level
-            # TODO: use analogue simulation with SchmidtTrigger gates
+            self.edge(self.next_level)
+            await asyncio.sleep(max(0.0, start + self.time - time.monotonic()))
+
+
+class RcAstableMultivibrator(AstableMultivibrator):
+    """Astable multivibrator of a Schmitt-trigger inverter and an RC network
+
+    The inverter output charges the capacitor through the resistor, and the
+    capacitor voltage is the inverter input, so the output toggles whenever
+    the capacitor reaches a threshold of the inverter. The capacitor is
+    simulated by the mixed-signal solver (see hardware/analogue.py).
+
+    The edges are still recorded as stimuli, replaying them runs the solver
+    until the same edge.
+    """
+    # 100 kOhm and 3.9 uF give about 1 s between the edges
+    RESISTANCE = 100e3
+    CAPACITANCE = 3.9e-6
+    # Simulated time to wait for an edge (e.g. not powered)
+    EDGE_TIMEOUT = 10.0
+
+    def __init__(self, psu: Psu | None = None, solver=None) -> None:
+        from boardsections.hardware.analogue import RcNode
+        from boardsections.hardware.u1_7414 import THRESHOLD_HIGH, THRESHOLD_LOW, SchmidtTrigger
+
+        self.trigger = SchmidtTrigger("astabilmv", psu)
+        self.capacitor = RcNode(
+            "astabilmv_rc", self.RESISTANCE, self.CAPACITANCE,
+            (THRESHOLD_LOW, THRESHOLD_HIGH), solver,
+        )
+        self.trigger.output.solder_to(self.capacitor.drive)
+        self.capacitor.output.solder_to(self.trigger.input, analogue=True)
+        self.output = self.trigger.output
+        self.edges = 0
+        _clocks.append(weakref.ref(self))
+        self.solver = self.capacitor.solver
+        # The capacitor is discharged before power on
+        self.solver.start()
+
+    @property
+    def time(self) -> float:
+        """Simulated time of the solver (seconds)"""
+        return self.solver.time
+
+    def edge(self, level: TTL) -> None:
+        """Run the solver until the output changes to the level"""
+        stimulus.record(stimulus.CLOCK, level.value)
+        self.edges += 1
+        steps = round(self.EDGE_TIMEOUT / self.solver.timestep)
+        self.solver.advance(steps, until=lambda: self.output.current_level is level)
+        if self.output.current_level is not level:
+            raise SystemError(f"The clock does not oscillate (not powered?), it is {self.clock_level}")
+        stimulus.checkpoint()
+
+
+def clocks() -> list[AstableMultivibrator]:
+    """The live clocks in creation order
+
+    The clocks are not HW elements (they have no inputs), but their edges
+    are part of the board state (see tools/snapshot.py).
+    """
+    _clocks[:] = [ref for ref in _clocks if ref() is not None]
+    return [clock for ref in _clocks if (clock := ref()) is not None]
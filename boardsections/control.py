@@ -0,0 +1,142 @@
+"""Control panel of the board: power switch, reset button and dip switches
+
+The external inputs are changed by events, which are queued and applied by
+the loop driving the clock of the board (Controller.run). The loop applies
+the queued events at a deterministic clock phase: right after the clock
+edge to the `phase` level (low by default, i.e. half a period before the
+flip-flops capture their data). So the latency of an event is at most one
+clock period, and the same events give the same run (see tools/stimulus.py).
+While the board is not powered, the clock does not run and the events are
+applied right away.
+
+The controller either follows the real time with the simulated time of the
+clock, or runs free, as fast as possible. A free running controller yields
+to the event loop after each time slice (SLICE_TIME), so many boards (each
+with its own PSU and dip switches, see main.build_board) can share one event
+loop without a slow board blocking the others.
+
+The stimulus recorder and the snapshots cover every board of the process,
+so only runs of one board can be recorded and replayed.
+
+Usage
+-----
+controller = Controller(board)
+task = asyncio.create_task(controller.run())
+await controller.power(on=True)
+await controller.program([DipSwitch(0, 0), DipSwitch(0, 1)])
+await controller.press_reset()
+await controller.release_reset()
+"""
+
+import asyncio
+from collections import deque
+from collections.abc import Callable
+import dataclasses
+import time
+
+from boardsections.hardware.dipswitches import DipSwitch
+from typedefinitions import TTL
+
+
+# Time slice of a free running controller before yielding (seconds)
+SLICE_TIME = 0.005
+
+
+@dataclasses.dataclass
+class Event:
+    """A change of an external input
+
+    The future is done when the event is applied, with the number of clock
+    edges before it. Cancelling the future (e.g. by a timeout of the caller)
+    before that drops the event. The futures of the events not applied when
+    the controller stops are cancelled.
+    """
+    description: str
+    apply: Callable[[], None]
+    done: asyncio.Future
+
+
+class Controller:
+    """Drive the clock of a board and apply the external input events"""
+    def __init__(self, board, realtime: bool = True, phase: TTL = TTL.L) -> None:
+        self.board = board
+        self.realtime = realtime
+        self.phase = phase
+        self.events: deque[Event] = deque()
+        self._posted = asyncio.Event()
+
+    @property
+    def powered(self) -> bool:
+        return self.board.psu.vcc.output.current_level is TTL.H
+
+    def post(self, description: str, apply: Callable[[], None]) -> asyncio.Future:
+        """Queue an event, returns the future of its application"""
+        event = Event(description, apply, asyncio.get_running_loop().create_future())
+        self.events.append(event)
+        self._posted.set()
+        return event.done
+
+    def power(self, on: bool) -> asyncio.Future:
+        """Switch the PSU on or off"""
+        return self.post(f"power {'on' if on else 'off'}", lambda: self.board.psu.power_switch(on))
+
+    def press_reset(self) -> asyncio.Future:
+        return self.post("reset pressed", self.board.reset.press)
+
+    def release_reset(self) -> asyncio.Future:
+        return self.post("reset released", self.board.reset.release)
+
+    def program(self, codes: list[DipSwitch]) -> asyncio.Future:
+        """Set the dip switches of the ROM"""
+        return self.post(f"program {codes}", lambda: self.board.rom.programming(codes))
+
+    def _apply_events(self) -> None:
+        while self.events:
+            event = self.events.popleft()
+            if event.done.done():
+                continue  # cancelled
+            try:
+                event.apply()
+            except Exception as error:
+                event.done.set_exception(error)
+            else:
+                event.done.set_result(self.board.clock.edges)
+        self._posted.clear()
+
+    def _drop_events(self) -> None:
+        while self.events:
+            self.events.popleft().done.cancel()
+        self._posted.clear()
+
+    async def run(self, edges: int | None = None) -> None:
+        """Drive the clock and apply the events (stop after the edges if given)
+
+        The events still queued when it stops are dropped, i.e. awaiting them
+        raises CancelledError.
+        """
+        try:
+            await self._run(edges)
+        finally:
+            self._drop_events()
+
+    async def _run(self, edges: int | None) -> None:
+        clock = self.board.clock
+        last_edge = clock.edges + edges if edges is not None else None
+        while last_edge is None or clock.edges < last_edge:
+            if not self.powered:
+                # No clock without power, only the events change the board
+                self._apply_events()
+                if not self.powered:
+                    await self._posted.wait()
+                    continue
+            start = time.monotonic() - clock.time
+            slice_start = time.monotonic()
+            while self.powered and (last_edge is None or clock.edges < last_edge):
+                clock.edge(clock.next_level)
+                if clock.clock_level is self.phase:
+                    self._apply_events()
+                if self.realtime:
+                    await asyncio.sleep(max(0.0, start + clock.time - time.monotonic()))
+                elif time.monotonic() - slice_start >= SLICE_TIME:
+                    await asyncio.sleep(0)
+                    slice_start = time.monotonic()
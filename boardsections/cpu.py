@@ -9,9 +9,7 @@ The sections inside the CPU usually are
 - An XOR calculation section to implement an XOR gate
 """
 
-from PySide6 import QtCore
-
-from boardsections.hardware.psu import PSU
+from boardsections.hardware.psu import Psu, default_psu
 from boardsections.hardware.u2_7474 import FlipFlop
 from boardsections.hardware.u3_7400 import Nand
 from boardsections.hardware.u4_74153 import Multiplexer
@@ -22,48 +20,52 @@ from typedefinitions import TTL
 
 class Register(FlipFlop):
     """CPU internal memory/register"""
-    def __init__(self) -> None:
-        super().__init__("register")
-        PSU.vcc.solder_to(self.preset_inv)
-        PSU.vcc.solder_to(self.clear_inv)
+    def __init__(self, psu: Psu | None = None) -> None:
+        psu = default_psu() if psu is None else psu
+        super().__init__("register", psu)
+        psu.vcc.solder_to(self.preset_inv)
+        # The clear input is soldered to the reset
 
 
 class PrgCnt(FlipFlop):
     """CPU program counter store"""
-    def __init__(self) -> None:
-        super().__init__("prog_cnt")
-        PSU.vcc.solder_to(self.preset_inv)
-        PSU.vcc.solder_to(self.clear_inv)
+    def __init__(self, psu: Psu | None = None) -> None:
+        psu = default_psu() if psu is None else psu
+        super().__init__("prog_cnt", psu)
+        psu.vcc.solder_to(self.preset_inv)
+        # The clear input is soldered to the reset
 
 
 class Alu:
     """The Arithmetic Logic Unit"""
-    def __init__(self) -> None:
-        self.mux = Multiplexer("alu")
-        PSU.ground.solder_to(self.mux.data2)
-        PSU.ground.solder_to(self.mux.data3)
-        PSU.ground.solder_to(self.mux.enable_inv)
-        PSU.ground.solder_to(self.mux.select1)
+    def __init__(self, psu: Psu | None = None) -> None:
+        psu = default_psu() if psu is None else psu
+        self.mux = Multiplexer("alu", psu)
+        psu.ground.solder_to(self.mux.data2)
+        psu.ground.solder_to(self.mux.data3)
+        psu.ground.solder_to(self.mux.enable_inv)
+        psu.ground.solder_to(self.mux.select1)
 
 
 class PrgCntCalc:
     """The program code address pointer calculator"""
-    def __init__(self) -> None:
-        self.mux = Multiplexer("prog_cnt_calc")
-        PSU.ground.solder_to(self.mux.data2)
-        PSU.ground.solder_to(self.mux.data3)
-        PSU.ground.solder_to(self.mux.enable_inv)
-        PSU.ground.solder_to(self.mux.select1)
+    def __init__(self, psu: Psu | None = None) -> None:
+        psu = default_psu() if psu is None else psu
+        self.mux = Multiplexer("prog_cnt_calc", psu)
+        psu.ground.solder_to(self.mux.data2)
+        psu.ground.solder_to(self.mux.data3)
+        psu.ground.solder_to(self.mux.enable_inv)
+        psu.ground.solder_to(self.mux.select1)
 
 
 @hw_elem
 class Xor():
     """An XOR logic by wired 4x NAND gates"""
-    def __init__(self) -> None:
-        self.nand1 = Nand("nand1")
-        self.nand2 = Nand("nand2")
-        self.nand3 = Nand("nand3")
-        self.nand4 = Nand("nand4")
+    def __init__(self, psu: Psu | None = None) -> None:
+        self.nand1 = Nand("nand1", psu)
+        self.nand2 = Nand("nand2", psu)
+        self.nand3 = Nand("nand3", psu)
+        self.nand4 = Nand("nand4", psu)
         self.output = self.nand4.output
 
         # Internal wiring of NAND gates
@@ -81,11 +83,9 @@ class Xor():
         self.input2_emitter.solder_to(self.nand3.input2)
 
     @input
-    @QtCore.Slot(TTL)
     def input1(self, new_value: TTL):
         self.input1_emitter.set_output_level(new_value)
 
     @input
-    @QtCore.Slot(TTL)
     def input2(self, new_value: TTL):
         self.input2_emitter.set_output_level(new_value)
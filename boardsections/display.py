@@ -0,0 +1,76 @@
+"""Display of the LEDs
+
+A human does not see every LED change, but the brightness of the LEDs, i.e.
+how long they are on while the eye integrates the light. The display samples
+the on-time of the LEDs into fixed frames, calculates the duty cycle of each
+LED in the frame, and renders the frame only when its quantized brightness
+values changed. So the cost of the display is bounded by the frame rate, not
+by the rate of the LED changes. The frames are rendered in real time, but
+their duty cycles are calculated in the simulated time of the LEDs.
+"""
+
+import asyncio
+from collections.abc import Callable
+import math
+
+from boardsections.hardware.leds import Led
+
+
+FRAMES_PER_SECOND = 25
+
+# Distinguished brightness values above off
+BRIGHTNESS_STEPS = 4
+
+# A frame is the brightness of each LED from 0 (off) to BRIGHTNESS_STEPS
+Frame = tuple[int, ...]
+
+
+class Display:
+    """Render the changed frames of the LEDs"""
+    def __init__(
+        self,
+        leds_shown: list[Led],
+        fps: float = FRAMES_PER_SECOND,
+        render: Callable[[list[Led], Frame], None] | None = None,
+    ) -> None:
+        self.leds = leds_shown
+        self.now = leds_shown[0].now
+        self.frame_time = 1.0 / fps
+        self.render = render or render_text
+        self.frame: Frame | None = None
+        self._frame_start = self.now()
+        # Total on-time of the LEDs at the frame start
+        self._on_times = [led.on_time(self._frame_start) for led in self.leds]
+
+    def sample(self, now: float | None = None) -> Frame | None:
+        """Close the current frame, returns it only when it has changed"""
+        now = self.now() if now is None else now
+        duration = now - self._frame_start
+        on_times = [led.on_time(now) for led in self.leds]
+        previous_on_times, self._on_times = self._on_times, on_times
+        self._frame_start = now
+        if duration <= 0:
+            return None
+        frame = tuple(
+            math.ceil(BRIGHTNESS_STEPS * min(max(on_time - previous, 0.0) / duration, 1.0))
+            for on_time, previous in zip(on_times, previous_on_times)
+        )
+        if frame == self.frame:
+            return None
+        self.frame = frame
+        return frame
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.frame_time)
+            frame = self.sample()
+            if frame is not None:
+                self.render(self.leds, frame)
+
+
+def render_text(leds_shown: list[Led], frame: Frame) -> None:
+    """Print a line of the LED brightness values, e.g. 'Pwr 100% | Reg 0% | ...'"""
+    print(" | ".join(
+        f"{led.name} {100 * brightness // BRIGHTNESS_STEPS:3d}%"
+        for led, brightness in zip(leds_shown, frame)
+    ))
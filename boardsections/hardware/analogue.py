@@ -0,0 +1,219 @@
+"""Mixed-signal simulation of the analogue RC nodes
+
+An RC node is a capacitor charged (or discharged) through a resistor by the
+output driving it. The voltage of the capacitor approaches the voltage of
+the driving output exponentially:
+
+    V(t + dt) = target + (V(t) - target) * exp(-dt / (R * C))
+
+The node voltages, targets and time constants of all the nodes of a solver
+are kept in NumPy arrays and integrated together on a fixed timestep grid.
+The voltages are not emitted on every timestep: the inputs reading a node
+(e.g. a Schmitt-trigger input) only care about its threshold crossings, so
+the node output wire only changes when the voltage crosses the low or the
+high threshold of the node. The crossings are handed to the digital side as
+level changes of the analogue output wire, and the digital reactions (e.g.
+the Schmitt-trigger output switching) change the targets before the next
+timestep.
+
+The solver advances either:
+
+- with the fixed timestep, in vectorized batches of timesteps of all nodes,
+  cut at the first crossing
+- adaptively, jumping right to the timestep of the next crossing, which is
+  calculated from the exponential (the targets are constant between
+  crossings)
+
+Both give the same crossings on the same timesteps (up to rounding).
+
+Usage
+-----
+solver = Solver(timestep=1e-5)
+capacitor = RcNode("rc", resistance=100e3, capacitance=3.9e-6,
+                   thresholds=(0.6, 4.2), solver=solver)
+trigger.output.solder_to(capacitor.drive)
+capacitor.output.solder_to(trigger.input, analogue=True)
+solver.start()
+solver.advance(steps=200_000)
+"""
+
+from collections.abc import Callable
+import math
+
+import numpy as np
+from boardsections.hardware.wiring import Wire
+from tools.wiring_checker import hw_elem, input
+from typedefinitions import TTL, Voltage
+
+
+# Default timestep of the solvers (seconds)
+TIMESTEP = 1e-5
+
+# Timesteps evaluated at once by the fixed timestep integration
+BATCH_STEPS = 4096
+
+# Sides of the thresholds: not known yet, below the low and above the high one
+UNKNOWN = -1
+BELOW = 0
+ABOVE = 1
+
+# The voltage of the driving TTL levels
+_TTL_VOLTAGES = {level: level.to_volt().level for level in TTL}
+
+
+class Solver:
+    """Integrate the RC nodes together"""
+    def __init__(self, timestep: float = TIMESTEP, adaptive: bool = True) -> None:
+        self.timestep = timestep
+        self.adaptive = adaptive
+        # Timesteps done so far
+        self.steps = 0
+        self.nodes: list["RcNode"] = []
+        # Node states by node index
+        self.voltage = np.zeros(0)
+        self.target = np.zeros(0)
+        self.time_constant = np.zeros(0)
+        self.low = np.zeros(0)
+        self.high = np.zeros(0)
+        self.side = np.zeros(0, dtype=np.int8)
+        # Decay of the distance from the target in one timestep
+        self._decay = np.zeros(0)
+
+    @property
+    def time(self) -> float:
+        """Simulated time (seconds)"""
+        return self.steps * self.timestep
+
+    def add(self, node: "RcNode", time_constant: float, thresholds: tuple[float, float]) -> int:
+        """Add a node at 0 V, return its index"""
+        self.nodes.append(node)
+        self.voltage = np.append(self.voltage, 0.0)
+        self.target = np.append(self.target, 0.0)
+        self.time_constant = np.append(self.time_constant, time_constant)
+        self.low = np.append(self.low, thresholds[0])
+        self.high = np.append(self.high, thresholds[1])
+        self.side = np.append(self.side, np.int8(UNKNOWN))
+        self._decay = np.exp(-self.timestep / self.time_constant)
+        return len(self.nodes) - 1
+
+    def start(self) -> None:
+        """Hand over the initial voltages of the new (soldered) nodes
+
+        Without this the inputs of a node only get its voltage at its first
+        threshold crossing.
+        """
+        self._hand_over(self._crossing())
+
+    def advance(self, steps: int, until: Callable[[], bool] | None = None) -> int:
+        """Integrate the timesteps, handing over the threshold crossings
+
+        Stops early after the crossing, which makes `until` true. Returns the
+        number of timesteps done.
+        """
+        step = self._jump if self.adaptive else self._batch
+        done = 0
+        while done < steps:
+            done += step(steps - done)
+            if until is not None and until():
+                break
+        return done
+
+    def _batch(self, steps: int) -> int:
+        """Fixed timesteps until the first crossing, at most a batch"""
+        count = min(steps, BATCH_STEPS)
+        exponents = np.arange(1, count + 1)[:, np.newaxis]
+        volts = self.target + (self.voltage - self.target) * self._decay ** exponents
+        above = volts > self.high
+        below = volts < self.low
+        crossing = np.where(
+            self.side == ABOVE, below, np.where(self.side == BELOW, above, above | below))
+        crossed = crossing.any(axis=1)
+        if not crossed.any():
+            self.voltage = volts[-1]
+            self.steps += count
+            return count
+        row = int(crossed.argmax())
+        self.voltage = volts[row]
+        self.steps += row + 1
+        self._hand_over(np.flatnonzero(crossing[row]))
+        return row + 1
+
+    def _jump(self, steps: int) -> int:
+        """Jump to the timestep of the next crossing (or the end)"""
+        distance = self.voltage - self.target
+        threshold = np.where(self.side == ABOVE, self.low, self.high)
+        approaching = np.where(self.side == ABOVE, self.target < self.low, self.target > self.high)
+        # Timesteps to reach the threshold: decay ** k == (threshold - target) / distance
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = (threshold - self.target) / distance
+            needed = np.where(
+                approaching & (ratio > 0) & (ratio < 1),
+                np.ceil(np.log(ratio) / np.log(self._decay)),
+                np.inf,
+            )
+        needed[(self.side == UNKNOWN) & ((self.voltage > self.high) | (self.voltage < self.low))] = 1
+        count = min(steps, int(needed.min())) if np.isfinite(needed.min()) else steps
+        count = max(count, 1)
+        # The rounding of the logarithm can miss the exact timestep by one
+        self.voltage = self.target + distance * self._decay ** count
+        crossing = self._crossing()
+        if not crossing.size and count < steps and math.isfinite(needed.min()):
+            self.voltage = self.target + distance * self._decay ** (count + 1)
+            count += 1
+            crossing = self._crossing()
+        self.steps += count
+        if crossing.size:
+            self._hand_over(crossing)
+        return count
+
+    def _crossing(self) -> np.ndarray:
+        """Indices of the nodes beyond their threshold on the other side"""
+        above = self.voltage > self.high
+        below = self.voltage < self.low
+        return np.flatnonzero(np.where(
+            self.side == ABOVE, below, np.where(self.side == BELOW, above, above | below)))
+
+    def _hand_over(self, indices: np.ndarray) -> None:
+        """Emit the voltage of the crossing nodes on their output wires"""
+        for node_idx in indices:
+            volts = float(self.voltage[node_idx])
+            self.side[node_idx] = ABOVE if volts > self.high[node_idx] else BELOW
+            self.nodes[node_idx].output.set_output_level(Voltage(volts))
+
+
+# The solver of the nodes created without one
+SOLVER = Solver()
+
+
+@hw_elem
+class RcNode:
+    """A capacitor charged through a resistor by the driving output
+
+    The output wire is analogue, and only changes when the voltage crosses
+    the thresholds of the inputs it is soldered to.
+    """
+    # The capacitor keeps its voltage, so it ends the combinational paths
+    sequential_inputs = ("drive",)
+
+    def __init__(
+        self,
+        name: str,
+        resistance: float,
+        capacitance: float,
+        thresholds: tuple[float, float],
+        solver: Solver | None = None,
+    ) -> None:
+        self.name = name
+        self.solver = solver or SOLVER
+        self.output = Wire(name, analogue=True)
+        self.index = self.solver.add(self, resistance * capacitance, thresholds)
+
+    @property
+    def voltage(self) -> float:
+        return float(self.solver.voltage[self.index])
+
+    @input
+    def drive(self, new_value: TTL | Voltage) -> None:
+        """The output charging the capacitor through the resistor"""
+        volts = _TTL_VOLTAGES[new_value] if isinstance(new_value, TTL) else new_value.level
+        self.solver.target[self.index] = volts
@@ -0,0 +1,279 @@
+"""Library of the 74xx ICs
+
+A part is described by the pins and the function of one of its units (e.g.
+one gate of the quad NAND IC). The function gets the input pins and the state
+bits by name as 0/1 values, and returns the output pins and the new state bits
+(the state bits not returned are kept).
+
+The function is compiled into a lookup table when the part is first used:
+the index is the input pins (lowest bits, in pin order) and the state bits
+above them, the entry is the output pins (lowest bits) and the new state bits
+above them. So every part is evaluated by the same table lookup.
+
+The simulated elements are IcUnit subclasses with an @input method for each
+input pin, which sets the bit of the pin and evaluates the part.
+
+Usage
+-----
+SN7486 = Part(
+    "7486", "quad 2-input XOR", 4,
+    inputs=("input1", "input2"), outputs=("output",),
+    function=lambda input1, input2: {"output": input1 ^ input2},
+)
+
+@hw_elem
+class XorGate(IcUnit):
+    part = SN7486
+
+    def __init__(self, name: str, psu: Psu | None = None) -> None:
+        self.output = Wire(f"{name}_out")
+        super().__init__(name, (self.output,), psu)
+
+    @input
+    def input1(self, new_value: TTL) -> None:
+        self._input(SN7486.pin("input1"), new_value)
+    ...
+"""
+
+from array import array
+from collections.abc import Callable
+import dataclasses
+from functools import cached_property
+import logging
+
+from boardsections.hardware.psu import Psu, default_psu
+from boardsections.hardware.wiring import Wire
+from tools.wiring_checker import hw_elem, input
+from typedefinitions import TTL
+
+
+@dataclasses.dataclass(frozen=True)
+class Part:
+    """The function of a unit of a 74xx IC"""
+    number: str
+    description: str
+    units: int  # in a package
+    inputs: tuple[str, ...]
+    outputs: tuple[str, ...]
+    function: Callable[..., dict[str, int]]
+    state: tuple[str, ...] = ()
+    # The state bits keeping the previous level of an input (for edges)
+    previous: dict[str, str] = dataclasses.field(default_factory=dict)
+
+    def pin(self, name: str) -> int:
+        """The bit mask of an input pin"""
+        return 1 << self.inputs.index(name)
+
+    @cached_property
+    def table(self) -> array:
+        """The lookup table of the outputs and the new state"""
+        names = self.inputs + self.state
+        table = array("I")
+        for index in range(1 << len(names)):
+            values = {name: index >> bit & 1 for bit, name in enumerate(names)}
+            result = self.function(**values)
+            entry = 0
+            for bit, name in enumerate(self.outputs + self.state):
+                entry |= (result[name] if name in result else values[name]) << bit
+            table.append(entry)
+        return table
+
+
+####################################
+## Parts
+####################################
+
+SN7400 = Part(
+    "7400", "quad 2-input NAND", 4,
+    inputs=("input1", "input2"),
+    outputs=("output",),
+    function=lambda input1, input2: {"output": 1 - (input1 & input2)},
+)
+
+SN7414 = Part(
+    "7414", "hex Schmitt-trigger inverter", 6,
+    inputs=("input",),
+    outputs=("output",),
+    function=lambda input: {"output": 1 - input},
+)
+
+def _d_flipflop(data, clock, preset_inv, clear_inv, stored, last_clock):
+    if not preset_inv and not clear_inv:
+        # Invalid, both outputs are high
+        return {"q": 1, "q_inv": 1, "last_clock": clock}
+    if not preset_inv:
+        stored = 1
+    elif not clear_inv:
+        stored = 0
+    elif clock and not last_clock:
+        stored = data
+    return {"q": stored, "q_inv": 1 - stored, "stored": stored, "last_clock": clock}
+
+SN7474 = Part(
+    "7474", "dual D flip-flop with preset and clear", 2,
+    inputs=("data", "clock", "preset_inv", "clear_inv"),
+    outputs=("q", "q_inv"),
+    function=_d_flipflop,
+    state=("stored", "last_clock"),
+    previous={"last_clock": "clock"},
+)
+
+def _multiplexer_4to1(data0, data1, data2, data3, select0, select1, enable_inv):
+    data = (data0, data1, data2, data3)[select1 << 1 | select0]
+    return {"output": 0 if enable_inv else data}
+
+SN74153 = Part(
+    "74153", "dual 4-to-1 multiplexer", 2,
+    inputs=("data0", "data1", "data2", "data3", "select0", "select1", "enable_inv"),
+    outputs=("output",),
+    function=_multiplexer_4to1,
+)
+
+SN7486 = Part(
+    "7486", "quad 2-input XOR", 4,
+    inputs=("input1", "input2"),
+    outputs=("output",),
+    function=lambda input1, input2: {"output": input1 ^ input2},
+)
+
+SN74157 = Part(
+    "74157", "quad 2-to-1 multiplexer", 4,
+    inputs=("data0", "data1", "select", "enable_inv"),
+    outputs=("output",),
+    function=lambda data0, data1, select, enable_inv: {
+        "output": 0 if enable_inv else data1 if select else data0
+    },
+)
+
+def _counter(clock, clear_inv, load_inv, enable_p, enable_t, data_a, data_b, data_c, data_d,
+             count_a, count_b, count_c, count_d, last_clock):
+    count = count_d << 3 | count_c << 2 | count_b << 1 | count_a
+    if not clear_inv:
+        count = 0  # asynchronous clear
+    elif clock and not last_clock:
+        if not load_inv:
+            count = data_d << 3 | data_c << 2 | data_b << 1 | data_a
+        elif enable_p and enable_t:
+            count = (count + 1) & 0b1111
+    bits = [count >> bit & 1 for bit in range(4)]
+    return {
+        "q_a": bits[0], "q_b": bits[1], "q_c": bits[2], "q_d": bits[3],
+        "ripple_carry": int(enable_t and count == 0b1111),
+        "count_a": bits[0], "count_b": bits[1], "count_c": bits[2], "count_d": bits[3],
+        "last_clock": clock,
+    }
+
+SN74161 = Part(
+    "74161", "synchronous 4-bit binary counter", 1,
+    inputs=("clock", "clear_inv", "load_inv", "enable_p", "enable_t",
+            "data_a", "data_b", "data_c", "data_d"),
+    outputs=("q_a", "q_b", "q_c", "q_d", "ripple_carry"),
+    function=_counter,
+    state=("count_a", "count_b", "count_c", "count_d", "last_clock"),
+    previous={"last_clock": "clock"},
+)
+
+# The parts by number
+PARTS = {part.number: part for part in (SN7400, SN7414, SN7474, SN74153, SN7486, SN74157, SN74161)}
+
+
+# TTL level by bit value
+_LEVELS = (TTL.L, TTL.H)
+
+
+@hw_elem
+class IcUnit:
+    """A unit of a part, evaluated by the lookup table of the part
+
+    The output wires are given in the order of the output pins of the part,
+    the unit is powered by the Vcc of the PSU of its board.
+
+    The input pins and the state bits can be unknown (X), e.g. every pin and
+    state bit is unknown after power on, and a Z input is read as X. Then the
+    table is looked up for every possible value of the unknown bits, and the
+    output pins and state bits differing between the results are X. A state
+    bit keeping the previous level of an input (see Part.previous) has the
+    same value as the input, unless that input is changing, so e.g. an
+    unknown clock does not make an edge when another input changes.
+    """
+    part: Part
+    powered: bool = False
+
+    def __init__(self, name: str, outputs: tuple[Wire, ...], psu: Psu | None = None) -> None:
+        psu = default_psu() if psu is None else psu
+        psu.vcc.solder_to(self.vcc)
+        self.name = name
+        self._outputs = outputs
+        self._table = self.part.table
+        self._input_count = len(self.part.inputs)
+        self._output_count = len(self.part.outputs)
+        self._state_mask = (1 << len(self.part.state)) - 1
+        # Input pin and the index bit of the state bit keeping its previous level
+        self._previous = [
+            (self.part.pin(input_name), 1 << self._input_count + self.part.state.index(state_name))
+            for state_name, input_name in self.part.previous.items()
+        ]
+        # Levels of the input pins and the state bits, and their unknown bits
+        self.pins = 0
+        self.unknown_pins = (1 << self._input_count) - 1
+        self.state = 0
+        self.unknown_state = self._state_mask
+
+    @input
+    def vcc(self, power: TTL) -> None:
+        self.powered = power == TTL.H
+        logging.info("%s powered=%s", self.name, self.powered)
+        self._evaluate(0)
+
+    def _input(self, pin: int, new_value: TTL) -> None:
+        """Set the level of the input pin (bit mask) and evaluate the part"""
+        if new_value is TTL.H:
+            self.pins |= pin
+            self.unknown_pins &= ~pin
+        elif new_value is TTL.L:
+            self.pins &= ~pin
+            self.unknown_pins &= ~pin
+        else:
+            self.pins &= ~pin
+            self.unknown_pins |= pin
+        self._evaluate(pin)
+
+    def _evaluate(self, changing: int) -> None:
+        """Look up the outputs and new state, the changing pin is a bit mask"""
+        index = self.state << self._input_count | self.pins
+        if not (self.unknown_pins or self.unknown_state):
+            entry = self._table[index]
+            self.state = entry >> self._output_count
+            if self.powered:
+                for bit, wire in enumerate(self._outputs):
+                    wire.set_output_level(_LEVELS[entry >> bit & 1])
+            return
+
+        # The bits being 1 and being 0 in every result
+        unknown = self.unknown_state << self._input_count | self.unknown_pins
+        same = []
+        for pin, previous in self._previous:
+            if pin != changing and unknown & pin and unknown & previous:
+                unknown &= ~previous
+                same.append((pin, previous))
+        ones = -1
+        zeros = -1
+        subset = unknown
+        while True:
+            completed = index | subset
+            for pin, previous in same:
+                if subset & pin:
+                    completed |= previous
+            entry = self._table[completed]
+            ones &= entry
+            zeros &= ~entry
+            if not subset:
+                break
+            subset = (subset - 1) & unknown
+        self.state = ones >> self._output_count & self._state_mask
+        self.unknown_state = ~(ones | zeros) >> self._output_count & self._state_mask
+        if self.powered:
+            for bit, wire in enumerate(self._outputs):
+                wire.set_output_level(
+                    TTL.H if ones >> bit & 1 else TTL.L if zeros >> bit & 1 else TTL.X
+                )
@@ -1,6 +1,13 @@
-"""Simulate the LEDs"""
+"""Simulate the LEDs
 
-from PySide6 import QtCore
+The LEDs do not print their changes, but accumulate their on-time, which the
+display samples by frames (see boardsections/display.py). Sampling does not
+change the LEDs, so their state only depends on the stimuli of the board. The on-time is
+taken from the simulated time of the board clock, so the brightness does not
+depend on the speed of the host and is reproduced by a replay.
+"""
+
+from collections.abc import Callable
 
 from tools.wiring_checker import hw_elem, input
 from typedefinitions import TTL, Voltage
@@ -9,31 +16,45 @@ from typedefinitions import TTL, Voltage
 # The voltage on the LED when it is considered ON
 LIGHTUP_VOLTAGE = Voltage(4.1)
 
+# The voltage of the TTL levels
+_TTL_VOLTAGES = {level: level.to_volt() for level in TTL}
+
 
 @hw_elem
 class Led:
-    def __init__(self, name: str, color: str) -> None:
+    def __init__(self, name: str, color: str, now: Callable[[], float]) -> None:
         self.name = name
         self.color = color
+        # The time source of the on-time accumulation (simulated seconds)
+        self.now = now
         self.catode_level: Voltage = Voltage(0.0)
         self.anode_level: Voltage = Voltage(0.0)
         self.is_on = False
+        # On-time accumulated until the last change, and when it changed
+        self._on_time = 0.0
+        self._updated = now()
 
     @input
-    @QtCore.Slot(TTL)
     def anode(self, new_value: TTL | Voltage) -> None:
         self._changed("anode_level", new_value)
 
     @input
-    @QtCore.Slot(TTL)
     def catode(self, new_value: TTL | Voltage) -> None:
         self._changed("catode_level", new_value)
 
     def _changed(self, side: str, new_value: TTL | Voltage):
         if isinstance(new_value, TTL):
-            new_volt_value = new_value.to_volt()
-        else:
-            new_volt_value = new_value
-        setattr(self, side, new_volt_value)
-        self.is_on = (self.anode_level - self.catode_level) > LIGHTUP_VOLTAGE
-        print(f'{self.name} LED {"ON" if self.is_on else "OFF"}')
+            new_value = _TTL_VOLTAGES[new_value]
+        setattr(self, side, new_value)
+        is_on = self.anode_level.level - self.catode_level.level > LIGHTUP_VOLTAGE.level
+        if is_on != self.is_on:
+            now = self.now()
+            self._on_time = self.on_time(now)
+            self._updated = now
+            self.is_on = is_on
+
+    def on_time(self, now: float) -> float:
+        """The total on-time until the time"""
+        if self.is_on:
+            return self._on_time + now - self._updated
+        return self._on_time
@@ -3,14 +3,16 @@
 It has ground and Vcc wires. The Vcc is only on high voltage when the PSU is
 switched on. All powered HW elements (like ICs) block their output wires, i.e.
 they do not emit voltage change signals, when not powered.
+
+The HW elements created without a PSU are powered by the default PSU, which
+is created on first use (see default_psu), not when importing.
 """
 
 from collections.abc import Callable
 import logging
 
-from PySide6 import QtCore
-
 from boardsections.hardware.wiring import Wire
+from tools import stimulus
 from typedefinitions import TTL
 
 
@@ -19,12 +21,13 @@ class Psu:
         self.ground = Ground()
         self.vcc = Vcc()
     
-    @QtCore.Slot(bool)
     def power_switch(self, on: bool) -> None:
         """Switch the PSU on or off"""
+        stimulus.record(stimulus.POWER, on)
         self.ground.output.set_output_level(TTL.L)
         self.vcc.output.set_output_level(TTL.H if on else TTL.L)
         logging.info(f"Board powered {'on' if on else 'off'}")
+        stimulus.checkpoint()
 
 
 class Ground:
@@ -39,7 +42,7 @@ class Ground:
     def solder_to(self, input: Callable[[TTL], None]) -> None:
         """Solder ground to the input"""
         self.output.solder_to(input)
-        logging.debug(f"Ground soldered to {input}")
+        logging.debug("Ground soldered to %s", input)
 
 
 class Vcc:
@@ -55,7 +58,22 @@ class Vcc:
     def solder_to(self, input: Callable[[TTL], None]) -> None:
         """Solder Vcc to the input"""
         self.output.solder_to(input)
-        logging.debug(f"Vcc soldered to {input}")
+        logging.debug("Vcc soldered to %s", input)
+
+
+# The PSU of the HW elements created without one
+_default_psu: Psu | None = None
+
 
+def default_psu() -> Psu:
+    """The default PSU, created on first use"""
+    global _default_psu
+    if _default_psu is None:
+        _default_psu = Psu()
+    return _default_psu
 
-PSU = Psu()
+def __getattr__(name: str) -> Psu:
+    """`PSU` is the default PSU"""
+    if name == "PSU":
+        return default_psu()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
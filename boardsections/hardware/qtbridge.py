@@ -0,0 +1,45 @@
+"""Qt integration of the wires
+
+The wires deliver their level changes by plain Python calls (see wiring.py).
+A Qt GUI gets them as Qt signals of a QObject per wire, so the slots of the
+widgets can be connected by any Qt connection type, e.g. queued into the GUI
+thread while the simulation runs in another one.
+
+Only this module imports PySide6, so Qt is loaded on first use.
+
+Usage
+-----
+from boardsections.hardware import qtbridge
+
+qtbridge.signals(board.clock.output).level_changed_ttl.connect(
+    widget.show_clock, QtCore.Qt.QueuedConnection)
+"""
+
+import weakref
+
+from PySide6.QtCore import QObject, Signal
+
+from boardsections.hardware.wiring import Wire
+from typedefinitions import TTL, Voltage
+
+
+class WireSignals(QObject):
+    """The level changes of a wire as Qt signals"""
+    level_changed_volt = Signal((Voltage,))
+    level_changed_ttl = Signal((TTL,))
+
+    def __init__(self, wire: Wire) -> None:
+        super().__init__(None)
+        self.wire_name = wire.name
+        wire.observe(self.level_changed_volt.emit if wire.analogue else self.level_changed_ttl.emit)
+
+
+# The signals of the wires, created on first use
+_signals: weakref.WeakKeyDictionary[Wire, WireSignals] = weakref.WeakKeyDictionary()
+
+
+def signals(wire: Wire) -> WireSignals:
+    """The Qt signals of the wire"""
+    if wire not in _signals:
+        _signals[wire] = WireSignals(wire)
+    return _signals[wire]
@@ -1,10 +1,7 @@
 """Simulate the 7414 6x Schmidt-Trigger IC"""
 
-import logging
-
-from PySide6 import QtCore
-
-from boardsections.hardware.psu import PSU
+from boardsections.hardware.iclib import SN7414, IcUnit
+from boardsections.hardware.psu import Psu
 from boardsections.hardware.wiring import Wire
 from tools.wiring_checker import hw_elem, input
 from typedefinitions import TTL, Voltage
@@ -13,41 +10,28 @@ from typedefinitions import TTL, Voltage
 THRESHOLD_HIGH = 4.2
 THRESHOLD_LOW = 0.6
 
+INPUT = SN7414.pin("input")
+
 
 @hw_elem
-class SchmidtTrigger:
-    powered: bool = False
+class SchmidtTrigger(IcUnit):
+    """An inverter with hysteresis on its analogue input"""
+    part = SN7414
 
-    def __init__(self, name: str) -> None:
-        PSU.vcc.solder_to(self.vcc)
-        self.name = name
-        self.output_value: TTL = TTL.L
+    def __init__(self, name: str, psu: Psu | None = None) -> None:
         self.output = Wire(f"{name}_out")
+        super().__init__(name, (self.output,), psu)
 
     @input
-    @QtCore.Slot(TTL)
-    def vcc(self, power: TTL) -> None:
-        self.powered = power == TTL.H
-        logging.info(f"{self.name} {self.powered=}")
-        self._output_changes()
-    
-    @input
-    @QtCore.Slot(TTL)
     def input(self, new_value: Voltage | TTL) -> None:
         if isinstance(new_value, TTL):
-            self.output_value = new_value
-            self._output_changes()
+            self._input(INPUT, new_value)
             return
 
-        if new_value > THRESHOLD_HIGH and self.output_value == TTL.L:
-            self.output_value = TTL.H
-        elif new_value < THRESHOLD_LOW and self.output_value == TTL.H:
-            self.output_value = TTL.L
-        else:
-            return
-
-        self._output_changes()
-
-    def _output_changes(self) -> None:
-        if self.powered:
-            self.output.set_output_level(self.output_value)
+        # The input level only changes when crossing the other threshold, an
+        # unknown input level is set by crossing either
+        unknown = self.unknown_pins & INPUT
+        if new_value > THRESHOLD_HIGH and (unknown or not self.pins & INPUT):
+            self._input(INPUT, TTL.H)
+        elif new_value < THRESHOLD_LOW and (unknown or self.pins & INPUT):
+            self._input(INPUT, TTL.L)
@@ -2,83 +2,59 @@
 
 import logging
 
-from PySide6 import QtCore
-
-from boardsections.hardware.psu import PSU
+from boardsections.hardware.iclib import SN7474, IcUnit
+from boardsections.hardware.psu import Psu
 from boardsections.hardware.wiring import Wire
 from tools.wiring_checker import hw_elem, input
 from typedefinitions import TTL
 
 
-PRESET_BIT_MASK = 0b10
-CLEAR_BIT_MASK = 0b01
+DATA = SN7474.pin("data")
+CLOCK = SN7474.pin("clock")
+PRESET_INV = SN7474.pin("preset_inv")
+CLEAR_INV = SN7474.pin("clear_inv")
 
 
 @hw_elem
-class FlipFlop:
-    powered: bool = False
+class FlipFlop(IcUnit):
+    part = SN7474
+    # Inputs, which do not change the outputs without a clock edge
+    sequential_inputs = ("data", "clock")
 
-    def __init__(self, name: str) -> None:
-        PSU.vcc.solder_to(self.vcc)
-        self.name = name
-        self.data_value: TTL = TTL.L
-        self.state_bits: int = 3  # actually undefined, but PRE/CLR=High is coming
+    def __init__(self, name: str, psu: Psu | None = None) -> None:
         self.output_q = Wire(f"{name}_q")
         self.output_q_inv = Wire(f"{name}_q_inv")
+        super().__init__(name, (self.output_q, self.output_q_inv), psu)
 
-    @input
-    @QtCore.Slot(TTL)
-    def vcc(self, power: TTL) -> None:
-        self.powered = power == TTL.H
-        logging.info(f"{self.name} {self.powered=}")
-        self._output_changes()
+    @property
+    def state_bits(self) -> int | None:
+        """The preset (higher) and clear (lower) input bits, 3 is normal mode
+
+        None while any of them is unknown.
+        """
+        if self.unknown_pins & (PRESET_INV | CLEAR_INV):
+            return None
+        return bool(self.pins & PRESET_INV) << 1 | bool(self.pins & CLEAR_INV)
 
     @input
-    @QtCore.Slot(TTL)
     def data(self, new_value: TTL) -> None:
-        self.data_value = new_value
+        self._input(DATA, new_value)
 
     @input
-    @QtCore.Slot(TTL)
     def clock(self, new_value: TTL) -> None:
         # In normal mode, LOW->HIGH edge of clock changes output with data value
-        if self.state_bits == 3 and new_value == TTL.H:
-            self._output_changes()
+        self._input(CLOCK, new_value)
 
     @input
-    @QtCore.Slot(TTL)
     def preset_inv(self, new_value: TTL) -> None:
-        if self.state_bits&PRESET_BIT_MASK == new_value.value*PRESET_BIT_MASK:
-            return
-        # Flip the preset bit and keep the clear bit
-        self.state_bits = new_value.value*PRESET_BIT_MASK | self.state_bits&CLEAR_BIT_MASK
-        self._output_changes()
+        self._input(PRESET_INV, new_value)
+        self._check_invalid()
 
     @input
-    @QtCore.Slot(TTL)
     def clear_inv(self, new_value: TTL) -> None:
-        if self.state_bits&CLEAR_BIT_MASK == new_value.value*CLEAR_BIT_MASK:
-            return
-        # Flip the clear bit and keep the preset bit
-        self.state_bits = new_value.value*CLEAR_BIT_MASK | self.state_bits&PRESET_BIT_MASK
-        self._output_changes()
+        self._input(CLEAR_INV, new_value)
+        self._check_invalid()
 
-    def _output_changes(self) -> None:
-        """Output needs to change"""
-        match self.state_bits:
-            case 3:  # normal
-                q = self.data_value
-                q_inv = ~self.data_value
-            case 2:  # clear
-                q = TTL.L
-                q_inv = TTL.H
-            case 1:  # preset
-                q = TTL.H
-                q_inv = TTL.L
-            case 0:  # invalid
-                q = TTL.H
-                q_inv = TTL.H
-                logging.warning("Active PRE and CLR at the same time is invalid")
-        if self.powered:
-            self.output_q.set_output_level(q)
-            self.output_q_inv.set_output_level(q_inv)
+    def _check_invalid(self) -> None:
+        if self.powered and self.state_bits == 0:
+            logging.warning("Active PRE and CLR at the same time is invalid")
@@ -1,96 +1,57 @@
 """Simulate the 74153 dual 4-to-1 multiplexer IC"""
 
-import logging
-
-from PySide6 import QtCore
-
-from boardsections.hardware.psu import PSU
+from boardsections.hardware.iclib import SN74153, IcUnit
+from boardsections.hardware.psu import Psu
 from boardsections.hardware.wiring import Wire
 from tools.wiring_checker import hw_elem, input
 from typedefinitions import TTL
 
 
-SELECT_BIT_MASK = [0b01, 0b10]
+DATA = [SN74153.pin(f"data{idx}") for idx in range(4)]
+SELECT0 = SN74153.pin("select0")
+SELECT1 = SN74153.pin("select1")
+ENABLE_INV = SN74153.pin("enable_inv")
 
 
 @hw_elem
-class Multiplexer:
-    powered: bool = False
+class Multiplexer(IcUnit):
+    part = SN74153
 
-    def __init__(self, name: str) -> None:
-        PSU.vcc.solder_to(self.vcc)
-        self.name = name
-        self.data_values: list[TTL] = [TTL.L for _ in range(4)]
-        self.enable_inv_value: TTL = TTL.L
-        self.select: int = 0*SELECT_BIT_MASK[0] + 0*SELECT_BIT_MASK[1]
+    def __init__(self, name: str, psu: Psu | None = None) -> None:
         self.output = Wire(f"{name}_out")
-        self.output_value: TTL = TTL.L
+        super().__init__(name, (self.output,), psu)
 
-    @input
-    @QtCore.Slot(TTL)
-    def vcc(self, power: TTL) -> None:
-        self.powered = power == TTL.H
-        logging.info(f"{self.name} {self.powered=}")
-        self._output_changes()
+    @property
+    def select(self) -> int | None:
+        """The index of the selected data input, None while unknown"""
+        if self.unknown_pins & (SELECT0 | SELECT1):
+            return None
+        return bool(self.pins & SELECT1) << 1 | bool(self.pins & SELECT0)
 
     @input
-    @QtCore.Slot(TTL)
     def data0(self, new_value: TTL) -> None:
-        self._data(0, new_value)
+        self._input(DATA[0], new_value)
 
     @input
-    @QtCore.Slot(TTL)
     def data1(self, new_value: TTL) -> None:
-        self._data(1, new_value)
+        self._input(DATA[1], new_value)
 
     @input
-    @QtCore.Slot(TTL)
     def data2(self, new_value: TTL) -> None:
-        self._data(2, new_value)
+        self._input(DATA[2], new_value)
 
     @input
-    @QtCore.Slot(TTL)
     def data3(self, new_value: TTL) -> None:
-        self._data(3, new_value)
-    
-    def _data(self, idx, new_value) -> None:
-        self.data_values[idx] = new_value
-        if ~self.enable_inv_value and self.select == idx:
-            self.output_value = new_value
-            self._output_changes()
+        self._input(DATA[3], new_value)
 
     @input
-    @QtCore.Slot(TTL)
     def select0(self, new_value: TTL) -> None:
-        self._select(0, new_value)
+        self._input(SELECT0, new_value)
 
     @input
-    @QtCore.Slot(TTL)
     def select1(self, new_value: TTL) -> None:
-        self._select(1, new_value)
-    
-    def _select(self, select_bit, new_value) -> None:
-        self.select = (
-            new_value.value*SELECT_BIT_MASK[select_bit] +
-            self.select&SELECT_BIT_MASK[~select_bit]
-        )
-        if ~self.enable_inv_value:
-            self.output_value = self.data_values[self.select]
-            self._output_changes()
+        self._input(SELECT1, new_value)
 
     @input
-    @QtCore.Slot(TTL)
-    def enable_inv(self, new_value) -> None:
-        self.enable_inv_value = new_value
-        # Output only changes if the actual data is HIGH
-        if self.data_values[self.select] == TTL.H:
-            # Enabling data out?
-            if new_value == TTL.L:
-                self.output_value = self.data_values[self.select]
-            else:
-                self.output_value = TTL.L
-            self._output_changes()
-
-    def _output_changes(self) -> None:
-        if self.powered:
-            self.output.set_output_level(self.output_value)
+    def enable_inv(self, new_value: TTL) -> None:
+        self._input(ENABLE_INV, new_value)
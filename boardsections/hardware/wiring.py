@@ -1,21 +1,55 @@
-"""Connections of HW elements simulated by Qt signals and slots
+"""Connections of HW elements simulated by signals and slots
 
 A HW element has input(s) and output(s). E.g. a NAND gate has 2x inputs and 1x
 output.
 
 Outputs are Wire objects. The change of voltage event on the wire is simulated
-by Qt signals. Output objects can be "soldered" to inputs, which are simulated
-by Qt slots. Soldering creates the connection from an output to input(s).
+by a signal. Output objects can be "soldered" to inputs, i.e. the slots, which
+are plain methods (or functions). Soldering creates the connection from an
+output to input(s).
 
 When the output changes, it emits a signal. All connected input slots are then
-executed. The triggered elements calculate their outputs and if there is a
-change emit their signals, and so on.
+executed in soldering order. The triggered elements calculate their outputs
+and if there is a change emit their signals, and so on.
+
+The signals are plain Python calls, so the simulation does not load Qt. A Qt
+GUI gets the level changes of a wire as Qt signals by hardware/qtbridge.py,
+which loads PySide6 on first use.
+
+Propagation
+-----------
+The level changes are not emitted right away, but appended to a worklist.
+The first change (e.g. a clock edge or the power switch) delivers the
+worklist in order, until the wires settle. The changes made by the input
+slots meanwhile are only appended, so the call stack does not grow with the
+logic depth.
+
+The changes queued while delivering the previous ones form the next delta
+cycle. A loop-free board settles in fewer delta cycles than the length of its
+longest path, so the number of delta cycles after each external change (e.g.
+clock edge) is limited by a budget (DELTA_CYCLES_PER_WIRE for each soldered
+wire). A board exceeding it is considered oscillating: the wires changing
+again and again are traced for a while, then reported in an OscillationError.
+
+Tracers (see add_tracer) are called after each delivered level change, when
+the inputs of the soldered elements have already been updated. Without
+tracers the delivery loop has no check for them at all: the traced loop is
+only switched in while there are tracers (from the next propagation). Settle
+observers (see add_settle_observer) are called after each propagation with
+its statistics.
+
+A change can also be deferred until the wires settled (see after_settling),
+e.g. the end of the power-on reset pulse, which is long compared to the
+propagation delays.
 """
 
+from collections import Counter, deque
 from collections.abc import Callable
+import itertools
 import logging
 import math
-from PySide6.QtCore import QObject, Signal
+import time
+import weakref
 
 from tools import wiring_checker
 from typedefinitions import TTL, Voltage
@@ -24,57 +58,112 @@ from typedefinitions import TTL, Voltage
 # Whether voltage wire is the default
 ANALOGUE_BY_DEFAULT = False
 
+# Wire ids in creation order
+_wire_ids = itertools.count()
+
+# Weak references of the wires, which are soldered to input(s), by wire id
+_soldered_wires: dict[int, weakref.ref] = {}
+
+# Delta cycles allowed per soldered wire until the wires settle
+DELTA_CYCLES_PER_WIRE = 2
+DELTA_CYCLES_MIN = 16
+
+# Level changes traced to find the oscillating wires
+OSCILLATION_TRACE = 1000
+
+# Level changes (wire, new level) not delivered yet
+_worklist: deque[tuple["Wire", TTL | Voltage]] = deque()
+_propagating = False
+
+# Callbacks deferred until the worklist is empty
+_after_settling: deque[Callable[[], None]] = deque()
+
+# Callbacks of the delivered level changes (e.g. coverage collection)
+_tracers: list[Callable[["Wire", TTL | Voltage], None]] = []
+
+# Callbacks of the settled propagations (e.g. metrics)
+_settle_observers: list[Callable[[int, int, int], None]] = []
+
+
+class OscillationError(SystemError):
+    """The wires do not settle"""
+    def __init__(self, wires: list[str]) -> None:
+        super().__init__(f"{wires} wire(s) oscillating")
+        self.wires = wires
+
 
 def volt_to_ttl(input: Callable[[TTL], None]) -> Callable[[Voltage], None]:
     """Replace a TTL input with an analogue input"""
     def converter(value: Voltage) -> None:
-        input(value.to_ttl)
+        input(value.to_ttl())
     return converter
 
 def ttl_to_volt(input: Callable[[Voltage], None]) -> Callable[[TTL], None]:
     """Replace an analogue input with a TTL input"""
     def converter(value: TTL) -> None:
-        input(value.to_volt)
+        input(value.to_volt())
     return converter
 
 
-class Wire(QObject):
+class Wire:
     """A wire from an output to input(s)"""
-    level_changed_volt = Signal((Voltage,))
-    level_changed_ttl = Signal((TTL,))
+    # Number of level changes on all wires, i.e. the simulation events
+    transition_count: int = 0
 
     def __init__(self,
                  name: str,
                  analogue: bool = ANALOGUE_BY_DEFAULT
     ) -> None:
-        super().__init__(None)
         self.name = name
         self.analogue = analogue
+        self.wire_id = next(_wire_ids)
+        # Port handles of the soldered inputs
+        self.sinks: list[int] = []
+        # The connected slots (inputs and observers) in connection order. The
+        # inputs are appended (e.g. thousands to the Vcc), the observers get
+        # a new list, so an observer can (dis)connect while called.
+        self.slots: list[Callable[[TTL | Voltage], None]] = []
         if analogue:
-            self.current_level: Voltage = Voltage(0.0)
+            # Unknown (NaN) until driven, like X of the digital wires
+            self.current_level: Voltage = Voltage(math.nan)
         else:
-            self.current_level: TTL = TTL.L
+            # Unknown until driven, e.g. by a powered output
+            self.current_level: TTL = TTL.X
 
     def solder_to(self,
                   input: Callable[[TTL | Voltage], None],
                   analogue: bool = ANALOGUE_BY_DEFAULT
     ) -> None:
         """Connect an output to an input"""
-        wiring_checker.input_connected(input)
-        if self.analogue:
-            if analogue:
-                # analogue wire to analogue input
-                self.level_changed_volt.connect(input)
-            else:
-                # analogue wire to TTL input
-                self.level_changed_volt.connect(volt_to_ttl(input))
-        else:
-            if analogue:
-                # TTL wire to analogue input
-                self.level_changed_ttl.connect(ttl_to_volt(input))
-            else:
-                # TTL wire to TTL input
-                self.level_changed_ttl.connect(input)
+        self.sinks.append(wiring_checker.input_connected(input))
+        if len(self.sinks) == 1:
+            _soldered_wires[self.wire_id] = weakref.ref(
+                self, lambda _, wire_id=self.wire_id: _soldered_wires.pop(wire_id, None))
+        if self.analogue and not analogue:
+            # analogue wire to TTL input
+            input = volt_to_ttl(input)
+        elif not self.analogue and analogue:
+            # TTL wire to analogue input
+            input = ttl_to_volt(input)
+        self.slots.append(input)
+
+    def observe(self, callback: Callable[[TTL | Voltage], None]) -> None:
+        """Call back on level changes, without being an input of a HW element
+
+        E.g. for debugging, only the observed wires pay for the call.
+        """
+        self.slots = [*self.slots, callback]
+
+    def unobserve(self, callback: Callable[[TTL | Voltage], None]) -> None:
+        """Remove an observer callback"""
+        slots = list(self.slots)
+        slots.remove(callback)
+        self.slots = slots
+
+    def emit(self, new_value: TTL | Voltage) -> None:
+        """Call the connected slots with the level"""
+        for slot in self.slots:
+            slot(new_value)
 
     def set_output_level(self, new_value: TTL | Voltage) -> None:
         """Set the voltage or TTL level on the wire
@@ -82,12 +171,137 @@ class Wire(QObject):
         The wire level is what the output defines. HW elements can set the
         same level multiple times, but the connected inputs only receive the
         related signal when this level is not the same as the previous one.
+
+        The signal is queued, and only delivered here if no propagation is
+        running yet.
         """
-        assert type(new_value) is Voltage if self.analogue else TTL
+        assert type(new_value) is (Voltage if self.analogue else TTL)
         if self.current_level != new_value:
-            logging.info(f"{self.name} -> {new_value}")
+            logging.info("%s -> %s", self.name, new_value)
             self.current_level = new_value
-            if self.analogue:
-                self.level_changed_volt.emit(new_value)
-            else:
-                self.level_changed_ttl.emit(new_value)
+            _worklist.append((self, new_value))
+            if not _propagating:
+                _propagate()
+
+
+def soldered_wires() -> list[Wire]:
+    """The wires soldered to input(s), in creation order"""
+    wires = (ref() for _, ref in sorted(_soldered_wires.items()))
+    return [wire for wire in wires if wire is not None]
+
+def add_tracer(tracer: Callable[[Wire, TTL | Voltage], None]) -> None:
+    """Call the tracer with the wire and its new level after each delivery"""
+    global _deliver
+    _tracers.append(tracer)
+    _deliver = _deliver_traced
+
+def remove_tracer(tracer: Callable[[Wire, TTL | Voltage], None]) -> None:
+    global _deliver
+    _tracers.remove(tracer)
+    if not _tracers:
+        _deliver = _deliver_untraced
+
+def add_settle_observer(observer: Callable[[int, int, int], None]) -> None:
+    """Call the observer after each propagation settled with the number of
+    delivered level changes, the delta cycles and the settling time (ns)"""
+    _settle_observers.append(observer)
+
+def remove_settle_observer(observer: Callable[[int, int, int], None]) -> None:
+    _settle_observers.remove(observer)
+
+def after_settling(callback: Callable[[], None]) -> None:
+    """Call back when the queued level changes are delivered (right away if
+    no propagation is running)"""
+    if _propagating:
+        _after_settling.append(callback)
+    else:
+        callback()
+
+def settling() -> bool:
+    """Whether queued level changes are being delivered"""
+    return _propagating
+
+def _propagate() -> None:
+    """Deliver the queued level changes until the wires settle"""
+    global _propagating
+    _propagating = True
+    # Delivered level changes and delta cycles
+    counts = [0, 0]
+    start = time.perf_counter_ns() if _settle_observers else 0
+    try:
+        _deliver(counts)
+        if _settle_observers:
+            elapsed = time.perf_counter_ns() - start
+            for observer in _settle_observers:
+                observer(counts[0], counts[1], elapsed)
+    except BaseException:
+        _worklist.clear()
+        _after_settling.clear()
+        raise
+    finally:
+        Wire.transition_count += counts[0]
+        _propagating = False
+
+def _deliver_untraced(counts: list[int]) -> None:
+    """Deliver the worklist, count the level changes and delta cycles"""
+    budget = DELTA_CYCLES_PER_WIRE * len(_soldered_wires) + DELTA_CYCLES_MIN
+    delta_cycles = 0
+    delta_cycle_remaining = 0
+    delivered = 0
+    try:
+        while _worklist or _after_settling:
+            if not _worklist:
+                _after_settling.popleft()()
+                continue
+            if not delta_cycle_remaining:
+                delta_cycles += 1
+                if delta_cycles > budget:
+                    raise OscillationError(_oscillating_wires())
+                delta_cycle_remaining = len(_worklist)
+            delta_cycle_remaining -= 1
+            wire, level = _worklist.popleft()
+            delivered += 1
+            for slot in wire.slots:
+                slot(level)
+    finally:
+        counts[:] = delivered, delta_cycles
+
+def _deliver_traced(counts: list[int]) -> None:
+    """_deliver_untraced calling the tracers after each level change"""
+    budget = DELTA_CYCLES_PER_WIRE * len(_soldered_wires) + DELTA_CYCLES_MIN
+    delta_cycles = 0
+    delta_cycle_remaining = 0
+    delivered = 0
+    try:
+        while _worklist or _after_settling:
+            if not _worklist:
+                _after_settling.popleft()()
+                continue
+            if not delta_cycle_remaining:
+                delta_cycles += 1
+                if delta_cycles > budget:
+                    raise OscillationError(_oscillating_wires())
+                delta_cycle_remaining = len(_worklist)
+            delta_cycle_remaining -= 1
+            wire, level = _worklist.popleft()
+            delivered += 1
+            for slot in wire.slots:
+                slot(level)
+            for tracer in _tracers:
+                tracer(wire, level)
+    finally:
+        counts[:] = delivered, delta_cycles
+
+# The delivery loop of the propagation, see add_tracer
+_deliver = _deliver_untraced
+
+def _oscillating_wires() -> list[str]:
+    """Deliver some more level changes and count them by wire"""
+    changes = Counter()
+    for _ in range(OSCILLATION_TRACE):
+        if not _worklist:
+            break
+        wire, level = _worklist.popleft()
+        changes[wire.name] += 1
+        wire.emit(level)
+    return [name for name, count in changes.most_common() if count > 1]
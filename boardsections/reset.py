@@ -0,0 +1,57 @@
+"""Reset section on the board
+
+The CLR inputs of the flip-flops are pulled up to Vcc by a resistor, and
+pulled low:
+
+- for a moment after power on, while a capacitor charges (power-on reset)
+- while the reset button is pressed
+
+The flip-flops are unknown (X) after power on, the reset brings the board
+into a known state.
+"""
+
+from boardsections.hardware.psu import Psu, default_psu
+from boardsections.hardware import wiring
+from boardsections.hardware.wiring import Wire
+from tools import stimulus
+from tools.wiring_checker import hw_elem, input
+from typedefinitions import TTL
+
+
+@hw_elem
+class ResetButton:
+    """Power-on reset and reset button, the output is active low"""
+    powered: bool = False
+
+    def __init__(self, psu: Psu | None = None) -> None:
+        psu = default_psu() if psu is None else psu
+        psu.vcc.solder_to(self.vcc)
+        self.pressed = False
+        self.output = Wire("reset_inv")
+
+    @input
+    def vcc(self, power: TTL) -> None:
+        powered = power == TTL.H
+        self.powered = powered
+        if powered:
+            # The capacitor holds the output low, until the board settled
+            self.output.set_output_level(TTL.L)
+            wiring.after_settling(self._output_changes)
+        else:
+            self._output_changes()
+
+    def press(self) -> None:
+        self._button(pressed=True)
+
+    def release(self) -> None:
+        self._button(pressed=False)
+
+    def _button(self, pressed: bool) -> None:
+        stimulus.record(stimulus.RESET, pressed)
+        self.pressed = pressed
+        self._output_changes()
+        stimulus.checkpoint()
+
+    def _output_changes(self) -> None:
+        # Pulled up to Vcc, which is low when not powered
+        self.output.set_output_level(TTL.H if self.powered and not self.pressed else TTL.L)
@@ -2,10 +2,9 @@
 
 from enum import Enum
 
-from PySide6 import QtCore
-
 from boardsections.hardware.dipswitches import DipSwitch, dip_switch_array
 from boardsections.hardware.wiring import Wire
+from tools import stimulus
 from tools.wiring_checker import hw_elem, input
 from typedefinitions import TTL
 
@@ -21,33 +20,48 @@ class InstrunctionMnemonic(Enum):
 class Rom:
     """The program code "burnt" into the ROM
     
-    The actual data is stored in the dip switch HW. This class:
+    The actual data is stored in the dip switch HW (the dip switch array of
+    the board by default). This class:
     - reads program code from dip switches by the program counter
     - can burn code content (simulating setting dip switches)
     - can provide verbose code
     """
-    def __init__(self) -> None:
-        self.address_value: TTL = TTL.L
+    def __init__(self, dip_switches: list[DipSwitch] | None = None) -> None:
+        self.dip_switches = dip_switch_array if dip_switches is None else dip_switches
+        self.address_value: TTL = TTL.X
         self.output_data = Wire("rom_out_data")
         self.output_address = Wire("rom_out_address")
     
     @input
-    @QtCore.Slot(TTL)
     def address(self, new_value: TTL) -> None:
         self.address_value = new_value
-        dipswitch: DipSwitch = dip_switch_array[new_value.value]
-        self.output_address.set_output_level(TTL(dipswitch.switch_one))
-        self.output_data.set_output_level(TTL(dipswitch.switch_two))
+        if new_value.known:
+            dipswitch: DipSwitch = self.dip_switches[new_value.value]
+            self.output_address.set_output_level(TTL(dipswitch.switch_one))
+            self.output_data.set_output_level(TTL(dipswitch.switch_two))
+            return
+
+        # Unknown address, only the switches being the same at all addresses
+        # are known
+        switch_ones = {dipswitch.switch_one for dipswitch in self.dip_switches}
+        switch_twos = {dipswitch.switch_two for dipswitch in self.dip_switches}
+        self.output_address.set_output_level(TTL(switch_ones.pop()) if len(switch_ones) == 1 else TTL.X)
+        self.output_data.set_output_level(TTL(switch_twos.pop()) if len(switch_twos) == 1 else TTL.X)
 
-    @staticmethod
-    def programming(new_codes: list[DipSwitch]) -> None:
+    def programming(self, new_codes: list[DipSwitch]) -> None:
         """Set the code in the dip switches"""
-        for address in range(len(dip_switch_array)):
-            dip_switch_array[address] = new_codes[address]
+        stimulus.record(stimulus.ROM, stimulus.pack_rom(new_codes))
+        for address in range(len(self.dip_switches)):
+            self.dip_switches[address] = new_codes[address]
+        # The address did not change, drive the outputs of the new code
+        self.address(self.address_value)
+        stimulus.checkpoint()
 
     def get_verbose_instruction(self) -> str:
-        """Returns a readable code, e.g. 'XOR 1'"""
-        code = dip_switch_array[self.address_value.value]
+        """Returns a readable code, e.g. 'XOR 1' ('?' at unknown address)"""
+        if not self.address_value.known:
+            return "?"
+        code = self.dip_switches[self.address_value.value]
         mnemonic = InstrunctionMnemonic(code.switch_one).name
         instr_data = code.switch_two
         return f'{mnemonic} {instr_data}'
@@ -12,100 +12,228 @@ Create and connect the board sections, i.e. HW elements or logical blocks:
 - CPU program counter storage
 - An arithmetic processor (a multiplexer) setting the Register
 - A program counter calculator (a multiplexer) setting the ProgCounter
-- LEDs
+- LEDs (shown by a display)
 - Reset button
+- Control panel applying the power, reset and dip switch events
+
+Usage
+-----
+python main.py                     # run the board in real time
+python main.py --record run.stim   # also stream the stimuli into a file
+python main.py --replay run.stim   # reproduce a recorded run at full speed
+python main.py --analogue-clock    # simulate the RC astable multivibrator
+python main.py --metrics 9464      # serve live metrics on http://127.0.0.1:9464/metrics
+python main.py --trace run.trace   # store the wire level changes (see tools/tracestore.py)
 """
 
-import asyncio
+import argparse
+import dataclasses
+import signal
+import sys
+import time
 
-from boardsections.clock import AstableMultivibrator
+from boardsections.clock import AstableMultivibrator, RcAstableMultivibrator
 from boardsections.cpu import Alu, PrgCnt, PrgCntCalc, Register, Xor
 from boardsections.hardware.dipswitches import DipSwitch
 from boardsections.hardware.leds import Led
-from boardsections.hardware.psu import PSU
+from boardsections.hardware.psu import Psu, default_psu
+from boardsections.reset import ResetButton
 from boardsections.rom import Rom
-from tools import wiring_checker
-
-
-####################################
-## Create simulated elements
-####################################
-
-# Power switch and Reset button
-# ??????
-
-# LEDs
-power_led = Led('Pwr', 'white')
-PSU.vcc.solder_to(power_led.anode)
-PSU.ground.solder_to(power_led.catode)
-register_led = Led('Reg', 'red')
-pc_led = Led('PC', 'yellow')
-clock_led = Led('Clock', 'blue')
-
-# CPU sections
-register = Register()
-prog_cnt = PrgCnt()
-xor = Xor()
-alu = Alu()
-prog_cnt_calc = PrgCntCalc()
-
-# Other computer HW sections
-clock = AstableMultivibrator()
-rom = Rom()
-
-####################################
-## Solder outputs to other elements
-####################################
-
-# Clock to Register, ProgCounter and LED
-clock.output.solder_to(register.clock)
-clock.output.solder_to(prog_cnt.clock)
-clock.output.solder_to(clock_led.anode)
-PSU.ground.solder_to(clock_led.catode)
-
-# Register to XOR, ALU and LED
-register.output_q.solder_to(xor.input1)
-register.output_q.solder_to(alu.mux.data1)
-register.output_q.solder_to(register_led.anode)
-PSU.ground.solder_to(register_led.catode)
-
-# Program Counter to ROM, Addres Pointer and LED
-prog_cnt.output_q.solder_to(rom.address)
-prog_cnt.output_q_inv.solder_to(prog_cnt_calc.mux.data0)
-prog_cnt.output_q.solder_to(pc_led.anode)
-PSU.ground.solder_to(pc_led.catode)
-
-# ROM to arithmetic and addressing sections
-rom.output_data.solder_to(xor.input2)
-rom.output_data.solder_to(prog_cnt_calc.mux.data1)
-rom.output_address.solder_to(alu.mux.select0)
-rom.output_address.solder_to(prog_cnt_calc.mux.select0)
-
-# XOR to ALU
-xor.output.solder_to(alu.mux.data0)
-
-# ALU to Register
-alu.mux.output.solder_to(register.data)
-
-# Addres Pointer to ProgCounter
-prog_cnt_calc.mux.output.solder_to(prog_cnt.data)
-
-
-####################################
-## Prepare execution
-####################################
-
-# Check that all inputs are connected
-wiring_checker.check()
-
-# Set the program code
-rom.programming([
-    DipSwitch(0, 0),  # XOR 0
-    DipSwitch(0, 1),  # XOR 1
-])
-
-####################################
-## Run the simulation
-####################################
-PSU.power_switch(on=True)
-asyncio.run(clock.run())
+from tools import netlist, stimulus, wiring_checker
+
+
+@dataclasses.dataclass
+class Board:
+    psu: Psu
+    reset: ResetButton
+    power_led: Led
+    register_led: Led
+    pc_led: Led
+    clock_led: Led
+    register: Register
+    prog_cnt: PrgCnt
+    xor: Xor
+    alu: Alu
+    prog_cnt_calc: PrgCntCalc
+    clock: AstableMultivibrator
+    rom: Rom
+
+
+def build_board(
+    analogue_clock: bool = False,
+    psu: Psu | None = None,
+    dip_switches: list[DipSwitch] | None = None,
+) -> Board:
+    """Create and solder the board, and check its wiring
+
+    With `analogue_clock` the astable multivibrator is simulated by its
+    Schmitt-trigger inverter and RC network. More boards can be built in the
+    same process with their own PSU and dip switches (the default ones
+    otherwise).
+    """
+    psu = default_psu() if psu is None else psu
+
+    ####################################
+    ## Create simulated elements
+    ####################################
+
+    # Power switch (see psu) and Reset button
+    reset = ResetButton(psu)
+
+    # Clock, the LEDs measure their on-time in its simulated time
+    clock = RcAstableMultivibrator(psu) if analogue_clock else AstableMultivibrator()
+
+    def now() -> float:
+        return clock.time
+
+    # LEDs
+    power_led = Led('Pwr', 'white', now)
+    psu.vcc.solder_to(power_led.anode)
+    psu.ground.solder_to(power_led.catode)
+    register_led = Led('Reg', 'red', now)
+    pc_led = Led('PC', 'yellow', now)
+    clock_led = Led('Clock', 'blue', now)
+
+    # CPU sections
+    register = Register(psu)
+    prog_cnt = PrgCnt(psu)
+    xor = Xor(psu)
+    alu = Alu(psu)
+    prog_cnt_calc = PrgCntCalc(psu)
+
+    # Other computer HW sections
+    rom = Rom(dip_switches)
+
+    ####################################
+    ## Solder outputs to other elements
+    ####################################
+
+    # Reset to Register and ProgCounter
+    reset.output.solder_to(register.clear_inv)
+    reset.output.solder_to(prog_cnt.clear_inv)
+
+    # Clock to Register, ProgCounter and LED
+    clock.output.solder_to(register.clock)
+    clock.output.solder_to(prog_cnt.clock)
+    clock.output.solder_to(clock_led.anode)
+    psu.ground.solder_to(clock_led.catode)
+
+    # Register to XOR, ALU and LED
+    register.output_q.solder_to(xor.input1)
+    register.output_q.solder_to(alu.mux.data1)
+    register.output_q.solder_to(register_led.anode)
+    psu.ground.solder_to(register_led.catode)
+
+    # Program Counter to ROM, Addres Pointer and LED
+    prog_cnt.output_q.solder_to(rom.address)
+    prog_cnt.output_q_inv.solder_to(prog_cnt_calc.mux.data0)
+    prog_cnt.output_q.solder_to(pc_led.anode)
+    psu.ground.solder_to(pc_led.catode)
+
+    # ROM to arithmetic and addressing sections
+    rom.output_data.solder_to(xor.input2)
+    rom.output_data.solder_to(prog_cnt_calc.mux.data1)
+    rom.output_address.solder_to(alu.mux.select0)
+    rom.output_address.solder_to(prog_cnt_calc.mux.select0)
+
+    # XOR to ALU
+    xor.output.solder_to(alu.mux.data0)
+
+    # ALU to Register
+    alu.mux.output.solder_to(register.data)
+
+    # Addres Pointer to ProgCounter
+    prog_cnt_calc.mux.output.solder_to(prog_cnt.data)
+
+    ####################################
+    ## Prepare execution
+    ####################################
+
+    # Check that all inputs are connected and there are no combinational loops
+    wiring_checker.check()
+    netlist.current().check()
+
+    return Board(
+        psu, reset, power_led, register_led, pc_led, clock_led,
+        register, prog_cnt, xor, alu, prog_cnt_calc, clock, rom,
+    )
+
+
+async def run(board: Board) -> None:
+    """Power on, run the clock and display the LEDs"""
+    # Only the interactive run needs the event loop, see tools/startup_benchmark.py
+    import asyncio
+
+    from boardsections.control import Controller
+    from boardsections.display import Display
+
+    controller = Controller(board)
+    display = Display([board.power_led, board.register_led, board.pc_led, board.clock_led])
+    await asyncio.gather(controller.run(), display.run(), controller.power(on=True))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="The 1-bit computer simulation")
+    parser.add_argument("--record", metavar="FILE", help="stream the stimuli into a file")
+    parser.add_argument("--replay", metavar="FILE", help="replay a recorded run and verify it")
+    parser.add_argument("--analogue-clock", action="store_true",
+                        help="simulate the RC astable multivibrator")
+    parser.add_argument("--metrics", metavar="PORT", type=int,
+                        help="serve the metrics in Prometheus format on the local port")
+    parser.add_argument("--trace", metavar="FILE", help="store the wire level changes into a file")
+    args = parser.parse_args()
+
+    board = build_board(args.analogue_clock)
+
+    if args.replay:
+        with open(args.replay, "rb") as file:
+            log = file.read()
+        start = time.perf_counter()
+        stimuli, checkpoints = stimulus.replay(log, board)
+        elapsed = time.perf_counter() - start
+        if checkpoints:
+            print(f"Replayed {stimuli} stimuli identically, verified at {checkpoints} checkpoint(s) in {elapsed:.3f}s")
+        else:
+            print(f"Replayed {stimuli} stimuli in {elapsed:.3f}s, unverified: the log has no checkpoint")
+        return
+
+    if args.record:
+        stimulus.recorder.open(args.record)
+        # Terminated, still close the log with its final checkpoint
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+    if args.metrics:
+        from tools import metrics
+
+        live_metrics = metrics.Metrics(board.clock)
+        live_metrics.start()
+        metrics.serve(live_metrics, args.metrics)
+
+    trace = None
+    if args.trace:
+        from tools.tracestore import TraceWriter
+
+        trace = TraceWriter(args.trace, clock=board.clock.output)
+        trace.start()
+
+    # Set the program code
+    board.rom.programming([
+        DipSwitch(0, 0),  # XOR 0
+        DipSwitch(0, 1),  # XOR 1
+    ])
+
+    ####################################
+    ## Run the simulation
+    ####################################
+    import asyncio
+
+    try:
+        asyncio.run(run(board))
+    finally:
+        stimulus.recorder.close()
+        if trace is not None:
+            trace.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+import main
+from boardsections.control import Controller
+from boardsections.hardware.dipswitches import DipSwitch
+from boardsections.hardware.psu import Psu
+from typedefinitions import TTL
+
+
+def build_board(codes: list[DipSwitch]):
+    return main.build_board(psu=Psu(), dip_switches=list(codes))
+
+
+def test_events_queued_after_a_bounded_run_are_cancelled():
+    board = build_board([DipSwitch(0, 0), DipSwitch(0, 1)])
+
+    async def scenario():
+        controller = Controller(board, realtime=False)
+        powered = controller.power(on=True)
+        await controller.run(edges=1)  # the edge to the phase level
+        assert powered.done()
+        pressed = controller.press_reset()
+        await controller.run(edges=1)  # the edge to high, the event is not applied
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(pressed, timeout=1.0)
+        assert not controller.events
+        assert not board.reset.pressed
+
+    asyncio.run(scenario())
+
+
+def test_program_while_running_drives_the_new_code():
+    board = build_board([DipSwitch(1, 0), DipSwitch(1, 0)])  # JMP 0, JMP 0
+
+    async def scenario():
+        controller = Controller(board, realtime=False)
+        controller.power(on=True)
+        await controller.run(edges=4)
+        assert board.prog_cnt.output_q.current_level is TTL.L
+        programmed = controller.program([DipSwitch(0, 0), DipSwitch(0, 0)])  # XOR 0, XOR 0
+        await controller.run(edges=4)
+        await programmed
+        assert board.rom.output_address.current_level is TTL.L
+        await controller.run(edges=2)
+        assert board.prog_cnt.output_q.current_level is TTL.H
+
+    asyncio.run(scenario())
@@ -0,0 +1,33 @@
+import pytest
+
+import main
+from boardsections.hardware.dipswitches import DipSwitch
+from boardsections.hardware.psu import Psu
+from tools import snapshot
+from tools.debugger import Debugger
+
+
+def state(board) -> tuple:
+    leds = (board.power_led, board.register_led, board.pc_led, board.clock_led)
+    return (
+        board.clock.edges,
+        board.clock.time,
+        [(led.is_on, led._on_time, led._updated, led.on_time(board.clock.time)) for led in leds],
+    )
+
+
+@pytest.mark.parametrize("analogue_clock", [False, True])
+def test_rewind_restores_the_captured_state(analogue_clock):
+    board = main.build_board(analogue_clock, Psu(), [DipSwitch(0, 1), DipSwitch(0, 1)])
+    board.psu.power_switch(on=True)
+    debugger = Debugger(board.clock, history=4)
+    debugger.run(max_edges=6)
+    captured, captured_state = snapshot.snapshot(), state(board)
+
+    debugger.run(max_edges=3)
+    assert state(board) != captured_state
+    debugger.rewind(3)
+
+    assert state(board) == captured_state
+    assert snapshot.snapshot() == captured
+    board.psu.power_switch(on=False)
@@ -0,0 +1,268 @@
+"""Bit-parallel, cycle-based simulation of the board
+
+The netlist is compiled into a plain (picklable) model: the operations of the
+elements in levelized order, and the wires and input ports they read and
+write. The model runs without the wires, so it can be shipped to worker
+processes.
+
+Every wire value is a Python int, each bit of it is a lane, i.e. an
+independent copy of the board. The operations are bitwise, so all the lanes
+are simulated at once. The lanes can differ by:
+
+- the ROM program (the dip switches are lane vectors too)
+- stuck-at faults of wires and input ports (see tools/fault_simulation.py)
+
+The simulation is cycle-based: every element is evaluated in each clock
+phase in level order (the board has no combinational loops, see
+Netlist.check()), and the flip-flops capture their data on the rising edge of
+their clock input. Unpowered elements keep their outputs.
+
+The simulation is two-state: there are no unknown (X) levels, the board is
+brought into a known state by the power-on reset pulse.
+
+The observable outputs are the LEDs: on when the anode is high and the catode
+is low.
+
+Usage
+-----
+model = compile_board(board.psu)
+machine = Machine(model, lanes=2, rom=rom_lanes([program_a, program_b]))
+for leds in machine.run(cycles=8):
+    ...
+"""
+
+from collections.abc import Iterator
+import dataclasses
+
+
+# Operation kinds and the input names and output wire attributes of the
+# element classes (subclasses use the kind of their base)
+def _kinds() -> dict[type, tuple[str, tuple[str, ...], tuple[str, ...]]]:
+    from boardsections.cpu import Xor
+    from boardsections.hardware.leds import Led
+    from boardsections.hardware.u1_7414 import SchmidtTrigger
+    from boardsections.hardware.u2_7474 import FlipFlop
+    from boardsections.hardware.u3_7400 import Nand
+    from boardsections.hardware.u4_74153 import Multiplexer
+    from boardsections.reset import ResetButton
+    from boardsections.rom import Rom
+
+    return {
+        Nand: ("nand", ("vcc", "input1", "input2"), ("output",)),
+        FlipFlop: (
+            "flipflop",
+            ("vcc", "data", "clock", "preset_inv", "clear_inv"),
+            ("output_q", "output_q_inv"),
+        ),
+        Multiplexer: (
+            "multiplexer",
+            ("vcc", "data0", "data1", "data2", "data3", "select0", "select1", "enable_inv"),
+            ("output",),
+        ),
+        SchmidtTrigger: ("inverter", ("vcc", "input"), ("output",)),
+        Xor: ("emitter", ("input1", "input2"), ("input1_emitter", "input2_emitter")),
+        Rom: ("rom", ("address",), ("output_data", "output_address")),
+        Led: ("led", ("anode", "catode"), ()),
+        ResetButton: ("reset", ("vcc",), ("output",)),
+    }
+
+# Primary input wires
+VCC = "vcc"
+GROUND = "ground"
+CLOCK = "clock"
+
+
+@dataclasses.dataclass
+class Model:
+    """The compiled board"""
+    wire_names: list[str]
+    # Name ("element.input") and wire index of each input port
+    port_names: list[str]
+    port_wires: list[int]
+    # Kind, input port indices and output wire indices in evaluation order
+    ops: list[tuple[str, tuple[int, ...], tuple[int, ...]]]
+    # Primary input wire indices and their kind (VCC, GROUND or CLOCK)
+    primaries: list[tuple[int, str]]
+    # Name, anode and catode port index of the LEDs
+    leds: list[tuple[str, int, int]]
+
+
+def compile_board(psu=None) -> Model:
+    """Compile the current netlist, powered by the PSU (the default one if
+    not given)"""
+    from boardsections.hardware.psu import default_psu
+    from tools import netlist
+
+    psu = default_psu() if psu is None else psu
+
+    board = netlist.current()
+    board.check()
+    kinds = _kinds()
+    model = Model([wire.name for wire in board.wires], [], [], [], [], [])
+    for element_idx in board.evaluation_order:
+        element = board.elements[element_idx]
+        kind, input_names, output_names = _kind(kinds, type(element))
+        element_name = getattr(element, "name", type(element).__name__)
+        ports = []
+        for input_name in input_names:
+            if input_name not in board.input_wires[element_idx]:
+                raise SystemError(f"{element_name}.{input_name} is not connected")
+            ports.append(len(model.port_names))
+            model.port_names.append(f"{element_name}.{input_name}")
+            model.port_wires.append(board.input_wires[element_idx][input_name])
+        outputs = tuple(
+            board.wire_indices[getattr(element, name).wire_id] for name in output_names
+        )
+        if kind == "led":
+            model.leds.append((element_name, *ports))
+        else:
+            model.ops.append((kind, tuple(ports), outputs))
+
+    for wire_idx, wire in enumerate(board.wires):
+        if board.drivers[wire_idx] >= 0:
+            continue
+        if wire is psu.vcc.output:
+            model.primaries.append((wire_idx, VCC))
+        elif wire is psu.ground.output:
+            model.primaries.append((wire_idx, GROUND))
+        else:
+            model.primaries.append((wire_idx, CLOCK))
+    return model
+
+def _kind(kinds: dict, klass: type) -> tuple[str, tuple[str, ...], tuple[str, ...]]:
+    for base in klass.__mro__:
+        if base in kinds:
+            return kinds[base]
+    raise SystemError(f"{klass.__qualname__} cannot be simulated bit-parallel")
+
+def rom_lanes(programs: list[list]) -> list[tuple[int, int]]:
+    """Dip switch lane vectors (switch one, switch two) by address
+
+    The programs are lists of DipSwitch, one program per lane.
+    """
+    rom = []
+    for address in range(len(programs[0])):
+        one = two = 0
+        for lane, program in enumerate(programs):
+            one |= program[address].switch_one << lane
+            two |= program[address].switch_two << lane
+        rom.append((one, two))
+    return rom
+
+
+class Machine:
+    """Lanes of the compiled board
+
+    Faults are given by wire or port index as (stuck-at-0 lanes, stuck-at-1
+    lanes).
+    """
+    def __init__(
+        self,
+        model: Model,
+        lanes: int,
+        rom: list[tuple[int, int]],
+        wire_faults: dict[int, tuple[int, int]] | None = None,
+        port_faults: dict[int, tuple[int, int]] | None = None,
+    ) -> None:
+        self.model = model
+        self.ones = (1 << lanes) - 1
+        self.rom = rom
+        self.wire_faults = wire_faults or {}
+        self.port_faults = port_faults or {}
+        self.values = [0] * len(model.wire_names)
+        for wire_idx in self.wire_faults:
+            self._drive(wire_idx, 0)
+        # Stored bit and previous clock input of the flip-flops by op index
+        self.states: dict[int, int] = {}
+        self.clocks: dict[int, int] = {}
+
+    def _drive(self, wire_idx: int, value: int) -> None:
+        if wire_idx in self.wire_faults:
+            stuck_at_0, stuck_at_1 = self.wire_faults[wire_idx]
+            value = value & ~stuck_at_0 | stuck_at_1
+        self.values[wire_idx] = value & self.ones
+
+    def _read(self, port: int) -> int:
+        value = self.values[self.model.port_wires[port]]
+        if port in self.port_faults:
+            stuck_at_0, stuck_at_1 = self.port_faults[port]
+            value = value & ~stuck_at_0 | stuck_at_1
+        return value
+
+    def settle(self, clock: int, reset: int = 0) -> None:
+        """Evaluate the board with the clock level (lane vector)
+
+        The reset pulse (power-on or button) is active in the `reset` lanes.
+        """
+        ones = self.ones
+        for wire_idx, kind in self.model.primaries:
+            self._drive(wire_idx, ones if kind == VCC else clock if kind == CLOCK else 0)
+        for op_idx, (kind, ports, outputs) in enumerate(self.model.ops):
+            inputs = [self._read(port) for port in ports]
+            match kind:
+                case "nand":
+                    _, input1, input2 = inputs
+                    results = (~(input1 & input2),)
+                case "flipflop":
+                    _, data, clock_input, preset_inv, clear_inv = inputs
+                    preset = ~preset_inv
+                    clear = ~clear_inv
+                    edge = clock_input & ~self.clocks.get(op_idx, 0)
+                    self.clocks[op_idx] = clock_input
+                    stored = self.states.get(op_idx, 0)
+                    stored = data & edge | stored & ~edge
+                    # Preset and clear are asynchronous, both active keep the
+                    # stored bit
+                    stored = preset & ~clear | stored & ~(preset ^ clear)
+                    self.states[op_idx] = stored
+                    results = (preset | stored & ~clear, clear | ~stored & ~preset)
+                case "multiplexer":
+                    _, data0, data1, data2, data3, select0, select1, enable_inv = inputs
+                    results = (~enable_inv & (
+                        data0 & ~select0 & ~select1 | data1 & select0 & ~select1 |
+                        data2 & ~select0 & select1 | data3 & select0 & select1
+                    ),)
+                case "inverter":
+                    results = (~inputs[1],)
+                case "emitter":
+                    results = tuple(inputs)
+                case "reset":
+                    # Pulled up to Vcc, except during the pulse
+                    results = (inputs[0] & ~reset,)
+                case "rom":
+                    address = inputs[0]
+                    (one0, two0), (one1, two1) = self.rom
+                    results = (
+                        two1 & address | two0 & ~address,
+                        one1 & address | one0 & ~address,
+                    )
+            if kind in ("emitter", "rom", "reset"):
+                for wire_idx, result in zip(outputs, results):
+                    self._drive(wire_idx, result)
+            else:
+                # Unpowered elements keep their outputs
+                powered = inputs[0]
+                for wire_idx, result in zip(outputs, results):
+                    self._drive(wire_idx, result & powered | self.values[wire_idx] & ~powered)
+
+    def leds(self) -> list[int]:
+        """Lane vectors of the LEDs being on"""
+        return [
+            self._read(anode) & ~self._read(catode) & self.ones
+            for _, anode, catode in self.model.leds
+        ]
+
+    def run(self, cycles: int) -> Iterator[list[int]]:
+        """Power on, then drive the clock cycles
+
+        Yields the LEDs after power on (and its reset pulse) and after each
+        clock edge.
+        """
+        self.settle(0, reset=self.ones)
+        self.settle(0)
+        yield self.leds()
+        for _ in range(cycles):
+            self.settle(self.ones)
+            yield self.leds()
+            self.settle(0)
+            yield self.leds()
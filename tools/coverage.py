@@ -0,0 +1,245 @@
+"""Toggle and state coverage of the board
+
+Records during the simulation:
+
+- toggle coverage: both edges (rise and fall) of each wire
+- state coverage: the values of the element states, i.e. all four
+  FlipFlop.state_bits cases and every Multiplexer.select value
+
+The coverage is recorded into preallocated packed bitmaps (2 bits per wire,
+4 bits per element state) by a tracer of the wire propagation (see
+wiring.add_tracer). The element states are only probed after the changes of
+the wires soldered to the inputs changing them (e.g. preset and clear of the
+flip-flops), so the collector is cheap enough to be left on.
+
+Coverage maps of the same board layout (e.g. collected by several processes)
+are merged by OR-ing their bitmaps.
+
+Usage
+-----
+collector = Collector()
+collector.start()
+...  # run the regression programs
+collector.stop()
+collector.coverage.merge(CoverageMap.from_bytes(data_of_other_process, collector.layout))
+print(collector.coverage.report())
+"""
+
+import dataclasses
+from functools import cached_property
+import struct
+import zlib
+
+from boardsections.hardware.u2_7474 import FlipFlop
+from boardsections.hardware.u4_74153 import Multiplexer
+from boardsections.hardware import wiring
+from tools import netlist
+from typedefinitions import TTL, Voltage
+
+
+MAGIC = b"OBPC"
+VERSION = 1
+HEADER = struct.Struct("<4sHIII")
+
+# Values of an element state
+STATE_VALUES = 4
+
+# The state attribute and the inputs changing it by element class (subclasses
+# use the one of their base)
+STATES: dict[type, tuple[str, tuple[str, ...]]] = {
+    FlipFlop: ("state_bits", ("preset_inv", "clear_inv")),
+    Multiplexer: ("select", ("select0", "select1")),
+}
+
+INPUTS = "inputs"  # the element name of the primary input wires
+
+
+@dataclasses.dataclass
+class Layout:
+    """Names of the coverage bits of a board"""
+    wire_names: list[str]
+    state_names: list[str]  # e.g. "register.state_bits"
+    # Element name, its output wire indices and state indices
+    elements: list[tuple[str, list[int], list[int]]]
+
+    @cached_property
+    def crc(self) -> int:
+        return zlib.crc32("\n".join(self.wire_names + self.state_names).encode())
+
+
+@dataclasses.dataclass
+class CoverageMap:
+    """Packed coverage bitmaps of a board layout
+
+    Toggle bit 2*i is the rise, 2*i+1 is the fall of the i-th wire. State bit
+    4*i+v is value v of the i-th element state.
+    """
+    layout: Layout
+    toggles: bytearray
+    states: bytearray
+
+    @classmethod
+    def empty(cls, layout: Layout) -> "CoverageMap":
+        return cls(
+            layout,
+            bytearray((2 * len(layout.wire_names) + 7) // 8),
+            bytearray((STATE_VALUES * len(layout.state_names) + 7) // 8),
+        )
+
+    def merge(self, other: "CoverageMap") -> None:
+        """Add the coverage of another map of the same layout"""
+        if other.layout.crc != self.layout.crc:
+            raise ValueError("Coverage of a board with a different layout")
+        self.toggles[:] = _or(self.toggles, other.toggles)
+        self.states[:] = _or(self.states, other.states)
+
+    def to_bytes(self) -> bytes:
+        header = HEADER.pack(
+            MAGIC, VERSION, self.layout.crc, len(self.layout.wire_names), len(self.layout.state_names))
+        return header + self.toggles + self.states
+
+    @classmethod
+    def from_bytes(cls, data: bytes, layout: Layout) -> "CoverageMap":
+        magic, version, crc, wire_count, state_count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a coverage map or unsupported version")
+        if crc != layout.crc:
+            raise ValueError("Coverage of a board with a different layout")
+        coverage = cls.empty(layout)
+        toggles_end = HEADER.size + len(coverage.toggles)
+        coverage.toggles[:] = data[HEADER.size:toggles_end]
+        coverage.states[:] = data[toggles_end:toggles_end + len(coverage.states)]
+        return coverage
+
+    def toggle_covered(self, wire_idx: int, fall: bool) -> bool:
+        return _bit(self.toggles, 2 * wire_idx + fall)
+
+    def state_covered(self, state_idx: int, value: int) -> bool:
+        return _bit(self.states, STATE_VALUES * state_idx + value)
+
+    def report(self) -> str:
+        """Readable coverage summary by element, listing the missing items"""
+        layout = self.layout
+        toggles = sum(bin(byte).count("1") for byte in self.toggles)
+        states = sum(bin(byte).count("1") for byte in self.states)
+        lines = [
+            f"toggle coverage: {toggles}/{2 * len(layout.wire_names)}"
+            f" ({_percent(toggles, 2 * len(layout.wire_names))})",
+            f"state coverage: {states}/{STATE_VALUES * len(layout.state_names)}"
+            f" ({_percent(states, STATE_VALUES * len(layout.state_names))})",
+        ]
+        for name, wire_indices, state_indices in layout.elements:
+            missing = [
+                f"{layout.wire_names[wire_idx]} {'fall' if fall else 'rise'}"
+                for wire_idx in wire_indices for fall in (False, True)
+                if not self.toggle_covered(wire_idx, fall)
+            ]
+            missing.extend(
+                f"{layout.state_names[state_idx]}={value}"
+                for state_idx in state_indices for value in range(STATE_VALUES)
+                if not self.state_covered(state_idx, value)
+            )
+            total = 2 * len(wire_indices) + STATE_VALUES * len(state_indices)
+            lines.append(f"{name}: {total - len(missing)}/{total}")
+            if missing:
+                lines.append(f"  missing: {', '.join(missing)}")
+        return "\n".join(lines)
+
+
+class Collector:
+    """Record the coverage of the current board"""
+    def __init__(self) -> None:
+        board = netlist.current()
+        self.layout = Layout([wire.name for wire in board.wires], [], [])
+        # Wire index by wire id, and the state probes (state index, element,
+        # attribute) after the changes of a wire by wire id
+        size = max(board.wire_indices, default=-1) + 1
+        self._wire_indices: list[int] = [-1] * size
+        self._probes: list[list[tuple[int, object, str]]] = [[] for _ in range(size)]
+        for wire_id, wire_idx in board.wire_indices.items():
+            self._wire_indices[wire_id] = wire_idx
+        self._wires = board.wires
+        # The previous level of the wires by wire index
+        self._levels: list[TTL] = [TTL.X] * len(board.wires)
+        self._elements: list[tuple[int, object, str]] = []
+
+        element_names = [INPUTS] + [
+            getattr(element, "name", type(element).__name__) for element in board.elements
+        ]
+        element_wires: list[list[int]] = [[] for _ in element_names]
+        element_states: list[list[int]] = [[] for _ in element_names]
+        for wire_idx, driver_idx in enumerate(board.drivers):
+            element_wires[driver_idx + 1].append(wire_idx)
+        for element_idx, element in enumerate(board.elements):
+            state = _state(type(element))
+            if state is None:
+                continue
+            attribute, input_names = state
+            state_idx = len(self.layout.state_names)
+            self.layout.state_names.append(f"{element_names[element_idx + 1]}.{attribute}")
+            element_states[element_idx + 1].append(state_idx)
+            self._elements.append((state_idx, element, attribute))
+            for input_name in input_names:
+                wire_idx = board.input_wires[element_idx].get(input_name)
+                if wire_idx is None:
+                    continue
+                probes = self._probes[board.wires[wire_idx].wire_id]
+                if (state_idx, element, attribute) not in probes:
+                    probes.append((state_idx, element, attribute))
+        self.layout.elements = [
+            item for item in zip(element_names, element_wires, element_states)
+            if item[1] or item[2]
+        ]
+        self.coverage = CoverageMap.empty(self.layout)
+
+    def start(self) -> None:
+        """Record the current states, then every change"""
+        self._levels = [_ttl(wire.current_level) for wire in self._wires]
+        for state_idx, element, attribute in self._elements:
+            self._state_changed(state_idx, getattr(element, attribute))
+        wiring.add_tracer(self._trace)
+
+    def stop(self) -> None:
+        wiring.remove_tracer(self._trace)
+
+    def _trace(self, wire: wiring.Wire, level: TTL | Voltage) -> None:
+        wire_id = wire.wire_id
+        if wire_id >= len(self._wire_indices) or self._wire_indices[wire_id] < 0:
+            return  # not soldered when the collector was created
+        level = _ttl(level)
+        wire_idx = self._wire_indices[wire_id]
+        previous = self._levels[wire_idx]
+        self._levels[wire_idx] = level
+        if level.known and previous.known and level is not previous:
+            # Rise L to H, fall H to L (changes to and from X/Z are not edges)
+            bit = 2 * wire_idx + (level is TTL.L)
+            self.coverage.toggles[bit >> 3] |= 1 << (bit & 7)
+        for state_idx, element, attribute in self._probes[wire_id]:
+            self._state_changed(state_idx, getattr(element, attribute))
+
+    def _state_changed(self, state_idx: int, value: int | None) -> None:
+        if value is None:
+            return  # unknown
+        bit = STATE_VALUES * state_idx + value
+        self.coverage.states[bit >> 3] |= 1 << (bit & 7)
+
+
+def _ttl(level: TTL | Voltage) -> TTL:
+    return level if type(level) is TTL else level.to_ttl()
+
+def _state(klass: type) -> tuple[str, tuple[str, ...]] | None:
+    for base in klass.__mro__:
+        if base in STATES:
+            return STATES[base]
+    return None
+
+def _or(bitmap: bytearray, other: bytearray) -> bytes:
+    """Bitwise OR of two bitmaps of the same size"""
+    merged = int.from_bytes(bitmap, "little") | int.from_bytes(other, "little")
+    return merged.to_bytes(len(bitmap), "little")
+
+def _bit(bitmap: bytearray, bit: int) -> bool:
+    return bool(bitmap[bit >> 3] >> (bit & 7) & 1)
+
+def _percent(count: int, total: int) -> str:
+    return f"{100 * count / total:.1f}%" if total else "-"
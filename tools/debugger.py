@@ -0,0 +1,160 @@
+"""Breakpoints and watchpoints of the simulation
+
+The debugger drives the clock itself (without sleeping), one edge at a time,
+and stops after the edge when a breakpoint is hit:
+
+- a wire transition, optionally to a given level
+- a condition on the state of the elements, checked after the edges when
+  any of the given wires changed (or after every edge, if no wire is given)
+- a clock cycle count (number of rising edges)
+
+The wires are watched by observer callbacks, so there is no check on the
+propagation of not watched wires, and nothing at all without watchpoints.
+
+The debugger can also keep the snapshots of the last edges, to rewind.
+
+Usage
+-----
+debugger = Debugger(board.clock)
+debugger.break_on_wire(board.prog_cnt.output_q, TTL.H)
+debugger.watch(
+    lambda: board.register.output_q.current_level == TTL.H
+            and board.rom.get_verbose_instruction().startswith("JMP"),
+    board.register.output_q, board.rom.output_address,
+)
+debugger.break_at_cycle(100)
+hits = debugger.run()
+"""
+
+from collections import deque
+from collections.abc import Callable
+import dataclasses
+
+from boardsections.clock import AstableMultivibrator
+from boardsections.hardware.wiring import Wire
+from tools import snapshot
+from typedefinitions import TTL, Voltage
+
+
+@dataclasses.dataclass
+class Hit:
+    """A breakpoint hit"""
+    watch: "Watch"
+    cycle: int
+    level: TTL | Voltage | None = None
+
+
+@dataclasses.dataclass(eq=False)
+class Watch:
+    """A breakpoint or watchpoint"""
+    description: str
+    wires: tuple[Wire, ...] = ()
+    level: TTL | Voltage | None = None
+    condition: Callable[[], bool] | None = None
+    cycle: int | None = None
+    # Observer callbacks of the wires
+    callbacks: list[Callable] = dataclasses.field(default_factory=list)
+
+
+class Debugger:
+    """Run the clock until breakpoints are hit"""
+    def __init__(self, clock: AstableMultivibrator, history: int = 0) -> None:
+        self.clock = clock
+        self.cycle = 0
+        self.watches: list[Watch] = []
+        # Hits and triggered conditions (once each, in trigger order) during
+        # the current edge
+        self._hits: list[Hit] = []
+        self._triggered: dict[Watch, None] = {}
+        # Conditions checked after every edge
+        self._edge_conditions: list[Watch] = []
+        self._cycle_watches: list[Watch] = []
+        # Snapshots before the last edges, to rewind
+        self.history: deque[tuple[int, bytes]] = deque(maxlen=history)
+
+    def break_on_wire(self, wire: Wire, level: TTL | Voltage | None = None) -> Watch:
+        """Break when the wire changes (to the level, if given)"""
+        watch = Watch(f"{wire.name} -> {level or 'any'}", (wire,), level=level)
+        def callback(new_level: TTL | Voltage) -> None:
+            if level is None or new_level == level:
+                self._hits.append(Hit(watch, self.cycle, new_level))
+        self._observe(watch, wire, callback)
+        self.watches.append(watch)
+        return watch
+
+    def watch(self, condition: Callable[[], bool], *wires: Wire, description: str = "") -> Watch:
+        """Break when the condition is true after an edge
+
+        The condition is only evaluated when any of the wires changed during
+        the edge, or after every edge if there are no wires given.
+        """
+        watch = Watch(description or getattr(condition, "__name__", "condition"),
+                      wires, condition=condition)
+        if wires:
+            def callback(_: TTL | Voltage) -> None:
+                self._triggered[watch] = None
+            for wire in wires:
+                self._observe(watch, wire, callback)
+        else:
+            self._edge_conditions.append(watch)
+        self.watches.append(watch)
+        return watch
+
+    def break_at_cycle(self, cycle: int) -> Watch:
+        """Break after the rising edge of the clock cycle"""
+        watch = Watch(f"cycle {cycle}", cycle=cycle)
+        self._cycle_watches.append(watch)
+        self.watches.append(watch)
+        return watch
+
+    def remove(self, watch: Watch) -> None:
+        """Remove a breakpoint or watchpoint"""
+        self.watches.remove(watch)
+        for wire, callback in zip(watch.wires, watch.callbacks):
+            wire.unobserve(callback)
+        if watch in self._edge_conditions:
+            self._edge_conditions.remove(watch)
+        if watch in self._cycle_watches:
+            self._cycle_watches.remove(watch)
+
+    def _observe(self, watch: Watch, wire: Wire, callback: Callable) -> None:
+        wire.observe(callback)
+        watch.callbacks.append(callback)
+
+    def step(self) -> list[Hit]:
+        """Drive one clock edge and return the breakpoints hit"""
+        if self.history.maxlen:
+            self.history.append((self.cycle, snapshot.snapshot()))
+        level = self.clock.next_level
+        if level == TTL.H:
+            self.cycle += 1
+        self.clock.edge(level)
+
+        hits, self._hits = self._hits, []
+        triggered, self._triggered = self._triggered, {}
+        for watch in [*triggered, *self._edge_conditions]:
+            if watch.condition():
+                hits.append(Hit(watch, self.cycle))
+        if level == TTL.H:
+            hits.extend(Hit(watch, self.cycle) for watch in self._cycle_watches
+                        if watch.cycle == self.cycle)
+        return hits
+
+    def run(self, max_edges: int | None = None) -> list[Hit]:
+        """Drive the clock until a breakpoint is hit (or the edge limit)"""
+        edges = 0
+        while max_edges is None or edges < max_edges:
+            hits = self.step()
+            edges += 1
+            if hits:
+                return hits
+        return []
+
+    def rewind(self, edges: int = 1) -> None:
+        """Restore the board state before the last edges (see history)"""
+        if edges > len(self.history):
+            raise ValueError(f"Only {len(self.history)} edges can be rewound")
+        for _ in range(edges - 1):
+            self.history.pop()
+        self.cycle, data = self.history.pop()
+        snapshot.restore(data)
@@ -0,0 +1,213 @@
+"""Sequential equivalence check of two boards
+
+Both boards are compiled into bit-parallel models (see tools/bitsim.py), each
+in a new process, since the wiring registry is global. Then every sequence
+of the external inputs up to the cycle depth is simulated on both boards at
+once, one lane per sequence:
+
+- the dip switches of the ROM (they can be changed at any cycle, see
+  boardsections/control.py)
+- the reset button (pressed in a cycle or not)
+
+The inputs of a cycle are applied in the low phase of the clock, then the
+clock rises and falls. The outputs are the LEDs, paired by name (or by the
+given mapping), and they are compared after power on and after every
+change. The boards start with their power-on reset, and all the sequences
+reach every state reachable within the depth.
+
+The lanes are simulated in batches, and all batches advance cycle by
+cycle, so the reported counterexample is one of the shortest differing
+sequences.
+
+Usage
+-----
+python -m tools.equivalence main:build_board my_refactoring:build_board --depth 3
+
+result = check(model_a, model_b, depth=3)
+if not result.equivalent:
+    print(result.counterexample)
+"""
+
+import argparse
+import dataclasses
+import importlib
+
+from tools import bitsim
+from tools.processes import in_new_process
+
+
+# Input bits of a cycle: switch one and two of each ROM address, then reset
+ADDRESSES = 2
+INPUT_BITS = 2 * ADDRESSES + 1
+
+# Lanes of a batch at most
+BATCH_LANE_BITS = 16
+
+
+@dataclasses.dataclass
+class CycleInputs:
+    """The external inputs of a cycle"""
+    program: list[tuple[int, int]]  # (switch one, switch two) by address
+    reset: bool
+
+    def __str__(self) -> str:
+        from boardsections.rom import InstrunctionMnemonic
+
+        program = ", ".join(
+            f"{InstrunctionMnemonic(one).name} {two}" for one, two in self.program)
+        return f"{program}{' + reset' if self.reset else ''}"
+
+
+@dataclasses.dataclass
+class Counterexample:
+    """The shortest input sequence giving different outputs"""
+    inputs: list[CycleInputs]
+    step: str  # e.g. "cycle 2 rising edge"
+    # The values of the differing outputs as (name of board A, of board B,
+    # value A, value B)
+    outputs: list[tuple[str, str, int, int]]
+
+    def __str__(self) -> str:
+        lines = [f"differ at {self.step}" + (", after the inputs:" if self.inputs else ":")]
+        lines.extend(f"  cycle {cycle}: {inputs}" for cycle, inputs in enumerate(self.inputs))
+        lines.extend(
+            f"  {name_a}={value_a} vs {name_b}={value_b}"
+            for name_a, name_b, value_a, value_b in self.outputs
+        )
+        return "\n".join(lines)
+
+
+@dataclasses.dataclass
+class Result:
+    equivalent: bool
+    depth: int
+    sequences: int
+    counterexample: Counterexample | None = None
+
+    def __str__(self) -> str:
+        if self.equivalent:
+            return f"equivalent up to {self.depth} cycles ({self.sequences} input sequences)"
+        return str(self.counterexample)
+
+
+def compile_board(build: str) -> bitsim.Model:
+    """Build the board by the "module:function" in a new process and compile it"""
+    return in_new_process(_compile, build)
+
+def _compile(build: str) -> bitsim.Model:
+    module_name, function_name = build.split(":")
+    board = getattr(importlib.import_module(module_name), function_name)()
+    return bitsim.compile_board(getattr(board, "psu", None))
+
+def check(
+    model_a: bitsim.Model,
+    model_b: bitsim.Model,
+    depth: int = 3,
+    outputs: dict[str, str] | None = None,
+) -> Result:
+    """Compare the boards for every input sequence up to the depth
+
+    The outputs map the LED names of board A to the ones of board B (by
+    default the same names).
+    """
+    pairs = _output_pairs(model_a, model_b, outputs)
+    variables = INPUT_BITS * depth
+    lane_bits = min(variables, BATCH_LANE_BITS)
+    lanes = 1 << lane_bits
+    batches = [
+        [bitsim.Machine(model, lanes, [(0, 0)] * ADDRESSES) for model in (model_a, model_b)]
+        for _ in range(1 << (variables - lane_bits))
+    ]
+
+    def compare(cycle: int, step: str) -> Counterexample | None:
+        for batch_idx, machines in enumerate(batches):
+            leds_a, leds_b = (machine.leds() for machine in machines)
+            differ = 0
+            for led_a, led_b in pairs:
+                differ |= leds_a[led_a] ^ leds_b[led_b]
+            if differ:
+                lane = (differ & -differ).bit_length() - 1
+                sequence = batch_idx << lane_bits | lane
+                return Counterexample(
+                    [_cycle_inputs(sequence, c) for c in range(cycle + 1)],
+                    step,
+                    [
+                        (model_a.leds[led_a][0], model_b.leds[led_b][0],
+                         leds_a[led_a] >> lane & 1, leds_b[led_b] >> lane & 1)
+                        for led_a, led_b in pairs
+                        if (leds_a[led_a] ^ leds_b[led_b]) >> lane & 1
+                    ],
+                )
+        return None
+
+    def result(counterexample: Counterexample | None) -> Result:
+        return Result(counterexample is None, depth, 1 << variables, counterexample)
+
+    for machines in batches:
+        for machine in machines:
+            machine.settle(0, reset=machine.ones)
+            machine.settle(0)
+    if found := compare(-1, "power on"):
+        return result(found)
+
+    for cycle in range(depth):
+        for batch_idx, machines in enumerate(batches):
+            vectors = [
+                _variable(INPUT_BITS * cycle + bit, batch_idx, lane_bits)
+                for bit in range(INPUT_BITS)
+            ]
+            rom = [(vectors[2 * address], vectors[2 * address + 1]) for address in range(ADDRESSES)]
+            for machine in machines:
+                machine.rom = rom
+                machine.settle(0, reset=vectors[-1])
+        if found := compare(cycle, f"cycle {cycle} inputs"):
+            return result(found)
+        for step, clock in (("reset released", 0), ("rising edge", -1), ("falling edge", 0)):
+            for machines in batches:
+                for machine in machines:
+                    machine.settle(clock & machine.ones)
+            if found := compare(cycle, f"cycle {cycle} {step}"):
+                return result(found)
+    return result(None)
+
+def _output_pairs(
+    model_a: bitsim.Model, model_b: bitsim.Model, outputs: dict[str, str] | None,
+) -> list[tuple[int, int]]:
+    """LED index pairs of the boards"""
+    names_a = [name for name, _, _ in model_a.leds]
+    names_b = [name for name, _, _ in model_b.leds]
+    mapping = outputs or {name: name for name in names_a}
+    missing = [name for name in mapping.values() if name not in names_b]
+    missing += [name for name in mapping if name not in names_a]
+    if missing:
+        raise ValueError(f"{missing} LED(s) not on both boards")
+    return [(names_a.index(name_a), names_b.index(name_b)) for name_a, name_b in mapping.items()]
+
+def _variable(index: int, batch_idx: int, lane_bits: int) -> int:
+    """Lane vector of an input variable: bit `index` of the sequence number"""
+    if index >= lane_bits:
+        return -1 if batch_idx >> (index - lane_bits) & 1 else 0
+    period = 2 << index
+    block = ((1 << (1 << index)) - 1) << (1 << index)
+    return block * (((1 << (1 << lane_bits)) - 1) // ((1 << period) - 1))
+
+def _cycle_inputs(sequence: int, cycle: int) -> CycleInputs:
+    bits = sequence >> INPUT_BITS * cycle
+    return CycleInputs(
+        [(bits >> 2 * address & 1, bits >> 2 * address + 1 & 1) for address in range(ADDRESSES)],
+        bool(bits >> 2 * ADDRESSES & 1),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("board_a", help='"module:function" building the first board')
+    parser.add_argument("board_b", help='"module:function" building the second board')
+    parser.add_argument("--depth", type=int, default=3, help="clock cycles")
+    args = parser.parse_args()
+
+    print(check(compile_board(args.board_a), compile_board(args.board_b), args.depth))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""Stuck-at fault simulation campaign
+
+Every wire and every input port of the board is faulted stuck-at-0 and
+stuck-at-1, and the faults are simulated by the bit-parallel model (see
+tools/bitsim.py): lane 0 is the golden (fault free) board, the other lanes
+are faulty boards. A fault is detected by a program, when any LED differs from
+the golden lane after power on or after a clock edge.
+
+The faults are simulated in batches of lanes, and the batches of all the
+programs can be fanned out to a process pool.
+
+Usage
+-----
+python -m tools.fault_simulation
+python -m tools.fault_simulation --cycles 16 --processes 4
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import dataclasses
+import itertools
+
+from tools import bitsim
+
+
+@dataclasses.dataclass(frozen=True)
+class Fault:
+    site: str  # wire name or "element.input"
+    stuck_at: int
+    wire: int  # index of the wire (or the wire of the port)
+    port: int | None = None  # index of the input port, None for wire faults
+
+    def __str__(self) -> str:
+        return f"{self.site} stuck-at-{self.stuck_at}"
+
+
+@dataclasses.dataclass
+class Coverage:
+    """Detection of the faults by the programs"""
+    faults: list[Fault]
+    programs: list[list]
+    cycles: int
+    # The first detecting clock edge (0: at power on) or None, by program and
+    # fault
+    detections: list[list[int | None]]
+
+    def detected(self, program_idx: int | None = None) -> list[Fault]:
+        """Faults detected by the program (by any program if not given)"""
+        rows = self.detections if program_idx is None else [self.detections[program_idx]]
+        return [
+            fault for fault_idx, fault in enumerate(self.faults)
+            if any(row[fault_idx] is not None for row in rows)
+        ]
+
+    def undetected(self) -> list[Fault]:
+        detected = set(self.detected())
+        return [fault for fault in self.faults if fault not in detected]
+
+    def report(self) -> str:
+        """Readable coverage summary"""
+        total = len(self.faults)
+        detected = len(self.detected())
+        lines = [
+            f"{total} faults, {len(self.programs)} programs, {self.cycles} cycles",
+            f"fault coverage: {detected}/{total} ({100 * detected / total:.1f}%)",
+            "by program:",
+        ]
+        for program_idx, program in enumerate(self.programs):
+            count = len(self.detected(program_idx))
+            lines.append(
+                f"  {program_name(program)}: {count}/{total} ({100 * count / total:.1f}%)")
+        undetected = self.undetected()
+        if undetected:
+            lines.append("undetected:")
+            lines.extend(f"  {fault}" for fault in undetected)
+        return "\n".join(lines)
+
+
+def program_name(program: list) -> str:
+    """The instructions of a program, e.g. 'XOR 0, JMP 1'"""
+    from boardsections.rom import InstrunctionMnemonic
+
+    return ", ".join(
+        f"{InstrunctionMnemonic(code.switch_one).name} {code.switch_two}" for code in program
+    )
+
+def all_programs(addresses: int = 2) -> list[list]:
+    """Every possible content of the dip switches"""
+    from boardsections.hardware.dipswitches import DipSwitch
+
+    codes = [DipSwitch(one, two) for one in (0, 1) for two in (0, 1)]
+    return [list(program) for program in itertools.product(codes, repeat=addresses)]
+
+def all_faults(model: bitsim.Model) -> list[Fault]:
+    """Stuck-at-0 and stuck-at-1 faults of every wire and input port"""
+    faults = [
+        Fault(name, stuck_at, wire_idx)
+        for wire_idx, name in enumerate(model.wire_names)
+        for stuck_at in (0, 1)
+    ]
+    faults.extend(
+        Fault(name, stuck_at, model.port_wires[port], port)
+        for port, name in enumerate(model.port_names)
+        for stuck_at in (0, 1)
+    )
+    return faults
+
+def detect(model: bitsim.Model, program: list, faults: list[Fault], cycles: int) -> list[int | None]:
+    """Simulate the faults next to the golden lane (runs in a worker process)
+
+    Returns the first detecting clock edge of each fault or None.
+    """
+    lanes = len(faults) + 1
+    wire_faults: dict[int, list[int]] = {}
+    port_faults: dict[int, list[int]] = {}
+    for lane, fault in enumerate(faults, start=1):
+        masks = wire_faults if fault.port is None else port_faults
+        site = fault.wire if fault.port is None else fault.port
+        masks.setdefault(site, [0, 0])[fault.stuck_at] |= 1 << lane
+    machine = bitsim.Machine(
+        model, lanes, bitsim.rom_lanes([program] * lanes),
+        {site: tuple(masks) for site, masks in wire_faults.items()},
+        {site: tuple(masks) for site, masks in port_faults.items()},
+    )
+
+    detections: list[int | None] = [None] * len(faults)
+    detected = 0
+    for edge, leds in enumerate(machine.run(cycles)):
+        differ = 0
+        for led in leds:
+            golden = -(led & 1) & machine.ones
+            differ |= led ^ golden
+        new = differ & ~detected
+        detected |= differ
+        while new:
+            lane = new.bit_length() - 1
+            detections[lane - 1] = edge
+            new &= ~(1 << lane)
+    return detections
+
+def campaign(
+    programs: list[list] | None = None,
+    cycles: int = 8,
+    faults: list[Fault] | None = None,
+    lanes: int = 256,
+    processes: int | None = None,
+    psu=None,
+) -> Coverage:
+    """Simulate the faults of the current board with the programs
+
+    The faults are split into batches of `lanes - 1`. With `processes` the
+    batches are simulated by a process pool. The board is powered by the PSU
+    (the default one if not given).
+    """
+    model = bitsim.compile_board(psu)
+    programs = programs or all_programs()
+    faults = all_faults(model) if faults is None else faults
+    batch = lanes - 1
+    tasks = [
+        (model, program, faults[start:start + batch], cycles)
+        for program in programs
+        for start in range(0, len(faults), batch)
+    ]
+    if processes:
+        with ProcessPoolExecutor(processes) as executor:
+            results = list(executor.map(detect, *zip(*tasks)))
+    else:
+        results = [detect(*task) for task in tasks]
+
+    batches = len(tasks) // len(programs)
+    detections = [
+        list(itertools.chain.from_iterable(results[idx * batches:(idx + 1) * batches]))
+        for idx in range(len(programs))
+    ]
+    return Coverage(faults, programs, cycles, detections)
+
+
+def main() -> None:
+    import main as board_main
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--cycles", type=int, default=8, help="clock cycles per program")
+    parser.add_argument("--lanes", type=int, default=256, help="lanes per batch")
+    parser.add_argument("--processes", type=int, help="size of the process pool")
+    args = parser.parse_args()
+
+    board = board_main.build_board()
+    coverage = campaign(
+        cycles=args.cycles, lanes=args.lanes, processes=args.processes, psu=board.psu)
+    print(coverage.report())
+
+
+if __name__ == '__main__':
+    main()
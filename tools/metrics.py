@@ -0,0 +1,219 @@
+"""Live metrics of a running simulation
+
+Counted and sampled after every settled propagation (see
+wiring.add_settle_observer), i.e. a few integer operations per clock edge,
+so the metrics can stay enabled at full speed:
+
+- counters: events (delivered level changes), propagations, clock edges and
+  cycles (rising edges)
+- histograms of the clock edges: settling time and events per edge
+
+The histograms are HDR-style: log-linear buckets with SUB_BUCKETS buckets
+per power of two, so every value is recorded within 1/SUB_BUCKETS relative
+error in constant time and memory.
+
+The metrics are only written by the simulation thread and read by others
+without locks: the readers may see a histogram in the middle of a record,
+which is off by one count at most.
+
+Pull the values by Metrics.sample() (also calculating the events/s and
+cycles/s since the previous sample), or serve them in the Prometheus text
+exposition format by serve(). The exposition only has the counters and the
+histograms (Prometheus calculates the rates), so the scrapes do not change
+the rates of the samples.
+
+Usage
+-----
+metrics = Metrics(board.clock)
+metrics.start()
+server = serve(metrics, port=9464)  # optional, GET http://127.0.0.1:9464/metrics
+...
+print(metrics.sample())
+print(metrics.histograms["edge_settle_ns"].percentile(99))
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+
+from boardsections.hardware import wiring
+from typedefinitions import TTL
+
+
+# Exact values below this, then this many buckets per power of two
+SUB_BUCKET_BITS = 3
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+PREFIX = "onebitpc_"
+
+
+class Histogram:
+    """Log-linear histogram of non-negative integers"""
+    def __init__(self, name: str, description: str, scale: float = 1.0) -> None:
+        self.name = name
+        self.description = description
+        # The exported value of a recorded 1 (e.g. 1e-9 for ns in seconds)
+        self.scale = scale
+        self.counts = [0] * (64 * SUB_BUCKETS)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value: int) -> None:
+        if value < SUB_BUCKETS:
+            self.counts[value] += 1
+        else:
+            shift = value.bit_length() - SUB_BUCKET_BITS - 1
+            self.counts[shift * SUB_BUCKETS + (value >> shift)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @staticmethod
+    def bucket_limit(index: int) -> int:
+        """The highest value of a bucket"""
+        if index < SUB_BUCKETS:
+            return index
+        shift = index // SUB_BUCKETS - 1
+        return ((index % SUB_BUCKETS + SUB_BUCKETS + 1) << shift) - 1
+
+    def percentile(self, percent: float) -> int:
+        """The upper limit of the bucket of the percentile (0 if empty)"""
+        rank = percent / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(self.bucket_limit(index), self.max)
+        return 0
+
+    def cumulative(self) -> list[tuple[int, int]]:
+        """(power of two limit, count of the values up to it) up to the max"""
+        counts = list(self.counts)
+        result = []
+        seen = 0
+        index = 0
+        for bits in range(max(self.max, 1).bit_length() + 1):
+            limit = (1 << bits) - 1
+            while index < len(counts) and self.bucket_limit(index) <= limit:
+                seen += counts[index]
+                index += 1
+            result.append((limit, seen))
+        return result
+
+
+class Metrics:
+    """Counters and histograms of the simulation"""
+    def __init__(self, clock=None) -> None:
+        self.clock = clock
+        self.events = 0
+        self.propagations = 0
+        self.edges = 0
+        self.cycles = 0
+        self.histograms = {
+            "edge_settle_ns": Histogram(
+                "edge_settle_seconds", "Time to settle after a clock edge", 1e-9),
+            "edge_events": Histogram(
+                "edge_events", "Level changes delivered after a clock edge"),
+        }
+        self._settle = self.histograms["edge_settle_ns"]
+        self._edge_events = self.histograms["edge_events"]
+        self._clock_level = clock.clock_level if clock is not None else None
+        # Events and cycles at the previous sample
+        self._sampled = (time.monotonic(), 0, 0)
+        self._sample_lock = threading.Lock()
+
+    def start(self) -> None:
+        wiring.add_settle_observer(self._settled)
+
+    def stop(self) -> None:
+        wiring.remove_settle_observer(self._settled)
+
+    def _settled(self, delivered: int, delta_cycles: int, elapsed_ns: int) -> None:
+        self.events += delivered
+        self.propagations += 1
+        if self.clock is None:
+            return
+        # A propagation changing the clock output was an edge (the analogue
+        # clock settles its capacitor crossings before the edge)
+        level = self.clock.clock_level
+        if level is self._clock_level:
+            return
+        self._clock_level = level
+        self.edges += 1
+        if level is TTL.H:
+            self.cycles += 1
+        self._settle.record(elapsed_ns)
+        self._edge_events.record(delivered)
+
+    def sample(self) -> dict[str, float]:
+        """The counters and the rates since the previous sample"""
+        with self._sample_lock:
+            now = time.monotonic()
+            current = (now, self.events, self.cycles)
+            sampled_at, events, cycles = self._sampled
+            self._sampled = current
+        duration = now - sampled_at
+        return {
+            "events": current[1],
+            "propagations": self.propagations,
+            "edges": self.edges,
+            "cycles": current[2],
+            "events_per_second": (current[1] - events) / duration if duration else 0.0,
+            "cycles_per_second": (current[2] - cycles) / duration if duration else 0.0,
+            "edge_settle_p50_ns": self._settle.percentile(50),
+            "edge_settle_p99_ns": self._settle.percentile(99),
+            "edge_settle_max_ns": self._settle.max,
+        }
+
+    def exposition(self) -> str:
+        """The counters and histograms in the Prometheus text exposition format"""
+        lines = []
+        for name, description in (
+            ("events", "Level changes delivered"),
+            ("propagations", "Settled propagations"),
+            ("edges", "Clock edges"),
+            ("cycles", "Clock cycles (rising edges)"),
+        ):
+            lines += [
+                f"# HELP {PREFIX}{name}_total {description}",
+                f"# TYPE {PREFIX}{name}_total counter",
+                f"{PREFIX}{name}_total {getattr(self, name)}",
+            ]
+        for histogram in self.histograms.values():
+            name = PREFIX + histogram.name
+            lines += [
+                f"# HELP {name} {histogram.description}",
+                f"# TYPE {name} histogram",
+            ]
+            for limit, count in histogram.cumulative():
+                lines.append(f'{name}_bucket{{le="{limit * histogram.scale:.6g}"}} {count}')
+            lines += [
+                f'{name}_bucket{{le="+Inf"}} {histogram.count}',
+                f"{name}_sum {histogram.total * histogram.scale:.6g}",
+                f"{name}_count {histogram.count}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def serve(metrics: Metrics, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve the exposition on /metrics from a daemon thread"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.exposition().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,270 @@
+"""Static netlist analysis
+
+Build the graph of the soldered HW elements and wires, and analyse it without
+running the simulation:
+
+- levelization: the topological level of each element and wire of the
+  combinational logic, i.e. the order a faster engine can evaluate them
+- combinational loops, which may never settle (see OscillationError)
+- fan-out of each wire and the critical path depth
+
+Elements are the @hw_elem instances of the wiring registry. An element drives
+the wires it has as attributes, except the wires of its child elements (e.g.
+the Xor section drives its input emitter wires, but its output wire is the
+output of its 4th NAND gate). Wires without a driver element (ground, Vcc,
+clock) are the primary inputs at level 0. An element is one level above its
+highest combinational input wire, and its output wires are on its level.
+
+The inputs named in the `sequential_inputs` attribute of an element class
+(e.g. data and clock of the flip-flop) are not combinational, they end the
+combinational paths.
+
+The netlist and its analyses are cached until the wiring registry changes.
+
+Usage
+-----
+netlist = current()
+netlist.check()  # raises SystemError on combinational loops
+print(netlist.report())
+"""
+
+from functools import cached_property
+
+from boardsections.hardware.wiring import Wire, soldered_wires
+from tools import wiring_checker
+
+
+# The netlist of the last current() call with the registry generation it was
+# built at
+_cached: tuple[int, "Netlist"] | None = None
+
+
+class Netlist:
+    """The graph of the HW elements and wires"""
+    def __init__(self) -> None:
+        # Elements and the names of their inputs
+        self.elements: list[object] = []
+        self.element_inputs: list[list[str]] = []
+        # Wire index of each connected input of the elements, by input name
+        self.input_wires: list[dict[str, int]] = []
+        # Wire indices driven by the elements
+        self.outputs: list[list[int]] = []
+        # Wires, their driver element index (-1 for primary inputs) and their
+        # soldered inputs as (element index or -1 for functions, input name)
+        self.wires: list[Wire] = []
+        self.drivers: list[int] = []
+        self.sinks: list[list[tuple[int, str]]] = []
+        # Wire index by wire_id
+        self.wire_indices: dict[int, int] = {}
+
+        element_indices: dict[int, int] = {}
+        port_inputs: dict[int, tuple[int, str]] = {}
+        for instance, first_handle, input_names in wiring_checker.registered_instances():
+            if id(instance) not in element_indices:
+                element_indices[id(instance)] = len(self.elements)
+                self.elements.append(instance)
+                self.element_inputs.append([])
+                self.input_wires.append({})
+                self.outputs.append([])
+            element_idx = element_indices[id(instance)]
+            self.element_inputs[element_idx].extend(input_names)
+            for input_idx, input_name in enumerate(input_names):
+                port_inputs[first_handle + input_idx] = (element_idx, input_name)
+
+        for element_idx, element in enumerate(self.elements):
+            for wire in self._driven_wires(element, element_indices):
+                wire_idx = self._add_wire(wire)
+                if self.drivers[wire_idx] < 0:
+                    self.drivers[wire_idx] = element_idx
+                    self.outputs[element_idx].append(wire_idx)
+        for wire in soldered_wires():
+            self._add_wire(wire)
+
+        for wire_idx, wire in enumerate(self.wires):
+            for handle in wire.sinks:
+                if handle in port_inputs:
+                    element_idx, input_name = port_inputs[handle]
+                    self.input_wires[element_idx][input_name] = wire_idx
+                else:
+                    element_idx, input_name = -1, wiring_checker.port_owner(handle)[1]
+                self.sinks[wire_idx].append((element_idx, input_name))
+
+    def _add_wire(self, wire: Wire) -> int:
+        if wire.wire_id not in self.wire_indices:
+            self.wire_indices[wire.wire_id] = len(self.wires)
+            self.wires.append(wire)
+            self.drivers.append(-1)
+            self.sinks.append([])
+        return self.wire_indices[wire.wire_id]
+
+    @staticmethod
+    def _driven_wires(element: object, element_indices: dict[int, int]) -> list[Wire]:
+        """Wire attributes of the element, except the ones of child elements"""
+        attributes = vars(element).values()
+        child_wires = {
+            id(wire)
+            for child in attributes if id(child) in element_indices and child is not element
+            for wire in vars(child).values() if isinstance(wire, Wire)
+        }
+        return [
+            wire for wire in attributes
+            if isinstance(wire, Wire) and id(wire) not in child_wires
+        ]
+
+    def combinational_inputs(self, element_idx: int) -> list[int]:
+        """Wire indices of the combinational inputs of the element"""
+        sequential = getattr(type(self.elements[element_idx]), "sequential_inputs", ())
+        return [
+            wire_idx for input_name, wire_idx in self.input_wires[element_idx].items()
+            if input_name not in sequential
+        ]
+
+    @cached_property
+    def fanins(self) -> list[list[int]]:
+        """Driver element indices of the combinational inputs by element"""
+        return [
+            [self.drivers[wire_idx] for wire_idx in self.combinational_inputs(element_idx)
+             if self.drivers[wire_idx] >= 0]
+            for element_idx in range(len(self.elements))
+        ]
+
+    @cached_property
+    def element_levels(self) -> list[int | None]:
+        """Topological level of the elements (None: in or after a loop)"""
+        fanouts: list[list[int]] = [[] for _ in self.elements]
+        pending = [len(fanin) for fanin in self.fanins]
+        for element_idx, fanin in enumerate(self.fanins):
+            for driver_idx in fanin:
+                fanouts[driver_idx].append(element_idx)
+
+        levels: list[int | None] = [None] * len(self.elements)
+        ready = [idx for idx, count in enumerate(pending) if count == 0]
+        for element_idx in ready:
+            levels[element_idx] = 1
+        while ready:
+            driver_idx = ready.pop()
+            for element_idx in fanouts[driver_idx]:
+                pending[element_idx] -= 1
+                if pending[element_idx] == 0:
+                    levels[element_idx] = 1 + max(levels[idx] for idx in self.fanins[element_idx])
+                    ready.append(element_idx)
+        return levels
+
+    @cached_property
+    def wire_levels(self) -> list[int | None]:
+        """Topological level of the wires (0: primary input)"""
+        return [
+            0 if driver_idx < 0 else self.element_levels[driver_idx]
+            for driver_idx in self.drivers
+        ]
+
+    @cached_property
+    def evaluation_order(self) -> list[int]:
+        """Element indices of the loop-free part, ordered by level"""
+        levels = self.element_levels
+        return sorted(
+            (idx for idx, level in enumerate(levels) if level is not None),
+            key=lambda idx: levels[idx],
+        )
+
+    @cached_property
+    def depth(self) -> int:
+        """The critical path depth, i.e. the highest element level"""
+        return max((level for level in self.element_levels if level is not None), default=0)
+
+    @cached_property
+    def loops(self) -> list[list[str]]:
+        """Names of the wires of each combinational loop"""
+        unleveled = {idx for idx, level in enumerate(self.element_levels) if level is None}
+        loops = []
+        for component in self._strongly_connected(unleveled):
+            members = set(component)
+            if len(members) == 1 and component[0] not in self.fanins[component[0]]:
+                continue  # after a loop, but not in it
+            loops.append(sorted({
+                self.wires[wire_idx].name
+                for element_idx in component
+                for wire_idx in self.combinational_inputs(element_idx)
+                if self.drivers[wire_idx] in members
+            }))
+        return loops
+
+    def _strongly_connected(self, element_indices: set[int]) -> list[list[int]]:
+        """Strongly connected components of the fan-in graph (iterative Tarjan)"""
+        index: dict[int, int] = {}
+        lowlink: dict[int, int] = {}
+        stack: list[int] = []
+        on_stack: set[int] = set()
+        components = []
+        for root in sorted(element_indices):
+            if root in index:
+                continue
+            work = [(root, iter(self.fanins[root]))]
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, fanin = work[-1]
+                for driver_idx in fanin:
+                    if driver_idx not in element_indices:
+                        continue
+                    if driver_idx not in index:
+                        index[driver_idx] = lowlink[driver_idx] = len(index)
+                        stack.append(driver_idx)
+                        on_stack.add(driver_idx)
+                        work.append((driver_idx, iter(self.fanins[driver_idx])))
+                        break
+                    if driver_idx in on_stack:
+                        lowlink[node] = min(lowlink[node], index[driver_idx])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(component)
+        return components
+
+    @cached_property
+    def fanouts(self) -> list[tuple[str, int]]:
+        """Wire names and their number of soldered inputs, highest first"""
+        return sorted(
+            ((wire.name, len(sinks)) for wire, sinks in zip(self.wires, self.sinks)),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+
+    def check(self) -> None:
+        """Check that the board has no combinational loops"""
+        if self.loops:
+            raise SystemError(f"combinational loop(s) {self.loops}")
+
+    def report(self, top_fanouts: int = 10) -> str:
+        """Readable summary of the analyses"""
+        lines = [
+            f"{len(self.elements)} elements, {len(self.wires)} wires",
+            f"critical path depth: {self.depth}",
+        ]
+        if self.loops:
+            lines.append("combinational loops:")
+            lines.extend(f"  {' -> '.join(loop)}" for loop in self.loops)
+        else:
+            lines.append("no combinational loops")
+        lines.append("highest fan-outs:")
+        lines.extend(f"  {name}: {fanout}" for name, fanout in self.fanouts[:top_fanouts])
+        return "\n".join(lines)
+
+
+def current() -> Netlist:
+    """The netlist of the current wiring, built again only after changes"""
+    global _cached
+    if _cached is None or _cached[0] != wiring_checker.generation:
+        _cached = (wiring_checker.generation, Netlist())
+    return _cached[1]
@@ -0,0 +1,169 @@
+"""Synthetic netlist generator
+
+The real board has only a handful of ICs. This tool builds larger, synthetic
+boards from the same HW elements (Nand, FlipFlop, Multiplexer), so that the
+wiring and the simulation can be measured on bigger designs.
+
+Available building blocks:
+
+- XOR chain: a chain of XOR sections (4x NAND each), every stage XOR-ing the
+  previous result with a primary input
+- Ripple counter: flip-flops toggling on their own Q-inverse, each clocked by
+  the Q-inverse of the previous stage
+- Mux tree: 4-to-1 multiplexers collecting the leaf inputs into one output,
+  the select lines are shared per tree level
+- Shift register: flip-flops on a common clock, Q of each soldered to the data
+  of the next one
+
+Usage
+-----
+board = build("xor_chain", gates=10_000, depth=16)
+wiring_checker.check()
+PSU.power_switch(on=True)
+for wire in board.inputs:
+    wire.set_output_level(TTL.H)
+
+A board is built from repeated blocks of the selected kind, until the number
+of gates reaches the requested count. The depth defines the size of one block
+(chain length, counter bits, tree levels or register length), i.e. the logic
+depth the signals need to ripple through.
+"""
+
+from collections.abc import Callable
+import dataclasses
+
+from boardsections.cpu import Xor
+from boardsections.hardware.psu import PSU
+from boardsections.hardware.u2_7474 import FlipFlop
+from boardsections.hardware.u4_74153 import Multiplexer
+from boardsections.hardware.wiring import Wire
+from boardsections.reset import ResetButton
+
+
+@dataclasses.dataclass
+class SyntheticBoard:
+    """The elements and the primary inputs/outputs of a generated board"""
+    kind: str
+    inputs: list[Wire] = dataclasses.field(default_factory=list)
+    clock: Wire | None = None
+    # Clears the flip-flops, which are unknown after power on
+    reset: ResetButton | None = None
+    outputs: list[Wire] = dataclasses.field(default_factory=list)
+    # Keep the elements alive, the wires only refer to their input slots
+    elements: list = dataclasses.field(default_factory=list)
+    gates: int = 0
+
+
+def xor_chain(board: SyntheticBoard, length: int, block: int = 0) -> None:
+    """Add a chain of XOR sections (4 gates each) to the board
+
+    The primary inputs of the board are shared by all chains.
+    """
+    _ensure_inputs(board, length + 1)
+    previous = board.inputs[0]
+    for idx in range(length):
+        xor = Xor()
+        previous.solder_to(xor.input1)
+        board.inputs[idx + 1].solder_to(xor.input2)
+        previous = xor.output
+        board.elements.append(xor)
+        board.gates += 4
+    board.outputs.append(previous)
+
+def ripple_counter(board: SyntheticBoard, bits: int, block: int = 0) -> None:
+    """Add an asynchronous binary counter of flip-flops to the board"""
+    _ensure_clock(board)
+    _ensure_reset(board)
+    previous = board.clock
+    for idx in range(bits):
+        flipflop = FlipFlop(f"cnt{block}_{idx}")
+        PSU.vcc.solder_to(flipflop.preset_inv)
+        board.reset.output.solder_to(flipflop.clear_inv)
+        flipflop.output_q_inv.solder_to(flipflop.data)
+        previous.solder_to(flipflop.clock)
+        previous = flipflop.output_q_inv
+        board.outputs.append(flipflop.output_q)
+        board.elements.append(flipflop)
+        board.gates += 1
+
+def mux_tree(board: SyntheticBoard, levels: int, block: int = 0) -> None:
+    """Add a tree of 4-to-1 multiplexers with 4**levels leaf inputs
+
+    Every tree level has its own pair of select lines, these are primary
+    inputs shared by all trees.
+    """
+    _ensure_inputs(board, 4**levels + 2*levels)
+    selects = board.inputs[4**levels:]
+    layer = board.inputs[:4**levels]
+    for level in range(levels):
+        next_layer = []
+        for idx in range(0, len(layer), 4):
+            mux = Multiplexer(f"mux{block}_{level}_{idx//4}")
+            for data, wire in enumerate(layer[idx:idx + 4]):
+                wire.solder_to(getattr(mux, f"data{data}"))
+            selects[2*level].solder_to(mux.select0)
+            selects[2*level + 1].solder_to(mux.select1)
+            PSU.ground.solder_to(mux.enable_inv)
+            next_layer.append(mux.output)
+            board.elements.append(mux)
+            board.gates += 1
+        layer = next_layer
+    board.outputs.extend(layer)
+
+def shift_register(board: SyntheticBoard, bits: int, block: int = 0) -> None:
+    """Add a serial-in shift register of flip-flops to the board
+
+    The clock is soldered from the last stage to the first one. The connected
+    inputs receive the clock signal in this order, so each stage takes the
+    data of the previous stage before that one changes.
+    """
+    _ensure_inputs(board, 1)
+    _ensure_clock(board)
+    _ensure_reset(board)
+    flipflops = [FlipFlop(f"shift{block}_{idx}") for idx in range(bits)]
+    previous = board.inputs[0]
+    for flipflop in flipflops:
+        PSU.vcc.solder_to(flipflop.preset_inv)
+        board.reset.output.solder_to(flipflop.clear_inv)
+        previous.solder_to(flipflop.data)
+        previous = flipflop.output_q
+    for flipflop in reversed(flipflops):
+        board.clock.solder_to(flipflop.clock)
+    board.outputs.append(previous)
+    board.elements.extend(flipflops)
+    board.gates += bits
+
+
+# The block builders by kind
+BLOCKS: dict[str, Callable[[SyntheticBoard, int, int], None]] = {
+    "xor_chain": xor_chain,
+    "ripple_counter": ripple_counter,
+    "mux_tree": mux_tree,
+    "shift_register": shift_register,
+}
+
+
+def build(kind: str, gates: int, depth: int) -> SyntheticBoard:
+    """Build a board with (at least) the given number of gates"""
+    if kind not in BLOCKS:
+        raise ValueError(f"Unknown block kind {kind!r}, use one of {list(BLOCKS)}")
+    add_block = BLOCKS[kind]
+    board = SyntheticBoard(kind)
+    block = 0
+    while board.gates < gates:
+        add_block(board, depth, block)
+        block += 1
+    return board
+
+def _ensure_inputs(board: SyntheticBoard, count: int) -> None:
+    """Create the missing primary input wires"""
+    for idx in range(len(board.inputs), count):
+        board.inputs.append(Wire(f"synth_in{idx}"))
+
+def _ensure_clock(board: SyntheticBoard) -> None:
+    if board.clock is None:
+        board.clock = Wire("synth_clock")
+
+def _ensure_reset(board: SyntheticBoard) -> None:
+    if board.reset is None:
+        board.reset = ResetButton()
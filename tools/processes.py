@@ -0,0 +1,36 @@
+"""Run functions in new processes
+
+The wiring registry and the default PSU are global, so e.g. every board of
+a benchmark or the two boards of an equivalence check are built in a fresh,
+spawned process. The function and its arguments and result must be
+picklable.
+
+Usage
+-----
+result = in_new_process(measure, "ripple_counter", 1000)
+"""
+
+from collections.abc import Callable
+import multiprocessing
+import os
+
+
+def in_new_process(fn: Callable, *args):
+    """Call the function in a spawned process and return its result"""
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_worker, args=(sender, fn, *args))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        raise SystemError(f"{fn.__name__}{args} worker died") from None
+    process.join()
+    return result
+
+def _worker(sender, fn: Callable, *args) -> None:
+    sender.send(fn(*args))
+    sender.close()
+    # Skip the teardown of the (up to millions of) objects
+    os._exit(0)
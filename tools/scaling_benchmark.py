@@ -0,0 +1,141 @@
+"""Scaling benchmark of synthetic boards
+
+Build boards of the netlist generator from 1k up to 1M gates, and measure:
+
+- construction time (creating and soldering the elements)
+- wiring_checker.check() time
+- power on time
+- events (wire level changes) per second while the inputs are toggled
+- Python memory per gate (traced by tracemalloc in a separate run, so that
+  tracing does not distort the timings, on at most MEMORY_GATES gates, since
+  tracing doubles the memory)
+
+Every measurement runs in a fresh process, since the wiring registry and the
+PSU are global.
+
+Usage
+-----
+python -m tools.scaling_benchmark
+python -m tools.scaling_benchmark --kind xor_chain --sizes 1000 10000 --cycles 20
+"""
+
+import argparse
+import dataclasses
+import time
+import tracemalloc
+
+from tools.processes import in_new_process
+
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+# Largest board traced for the memory per gate (which does not depend on the
+# size), 1M gates take about 3 GB untraced
+MEMORY_GATES = 100_000
+
+# Block size of each kind, keep the logic depth of one block moderate
+DEFAULT_DEPTHS = {
+    "xor_chain": 16,
+    "ripple_counter": 16,
+    "mux_tree": 3,
+    "shift_register": 64,
+}
+
+
+@dataclasses.dataclass
+class Measurement:
+    kind: str
+    gates: int
+    construction_s: float
+    check_s: float
+    power_on_s: float
+    events: int
+    events_per_s: float
+    bytes_per_gate: float = 0.0
+
+
+def measure(kind: str, gates: int, depth: int, cycles: int) -> Measurement:
+    """Build a board and time its phases (runs in a worker process)"""
+    from boardsections.hardware.psu import PSU
+    from boardsections.hardware.wiring import Wire
+    from tools import netlist_generator, wiring_checker
+    from typedefinitions import TTL
+
+    start = time.perf_counter()
+    board = netlist_generator.build(kind, gates, depth)
+    built = time.perf_counter()
+    wiring_checker.check()
+    checked = time.perf_counter()
+    PSU.power_switch(on=True)
+    powered = time.perf_counter()
+
+    events_before = Wire.transition_count
+    level = TTL.L
+    for _ in range(cycles):
+        level = ~level
+        for wire in board.inputs:
+            wire.set_output_level(level)
+        if board.clock is not None:
+            board.clock.set_output_level(level)
+    stimulated = time.perf_counter()
+    events = Wire.transition_count - events_before
+
+    return Measurement(
+        kind=kind,
+        gates=board.gates,
+        construction_s=built - start,
+        check_s=checked - built,
+        power_on_s=powered - checked,
+        events=events,
+        events_per_s=events / (stimulated - powered) if stimulated > powered else 0.0,
+    )
+
+def measure_memory(kind: str, gates: int, depth: int) -> float:
+    """Python memory allocated per gate while building (runs in a worker process)"""
+    from tools import netlist_generator
+
+    tracemalloc.start()
+    board = netlist_generator.build(kind, gates, depth)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return allocated / board.gates
+
+def run(kinds: list[str], sizes: list[int], depth: int | None, cycles: int) -> list[Measurement]:
+    """Measure all kinds and sizes, each in a new process"""
+    results = []
+    for kind in kinds:
+        kind_depth = depth or DEFAULT_DEPTHS[kind]
+        for gates in sizes:
+            result = in_new_process(measure, kind, gates, kind_depth, cycles)
+            result.bytes_per_gate = in_new_process(
+                measure_memory, kind, min(gates, MEMORY_GATES), kind_depth)
+            print(_format_row(result), flush=True)
+            results.append(result)
+    return results
+
+def _format_row(result: Measurement) -> str:
+    return (
+        f"{result.kind:<15} {result.gates:>9} "
+        f"{result.construction_s:>10.3f} {result.check_s:>10.4f} "
+        f"{result.power_on_s:>10.3f} {result.events:>10} "
+        f"{result.events_per_s:>12.0f} {result.bytes_per_gate:>10.0f}"
+    )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--kind", action="append", choices=list(DEFAULT_DEPTHS),
+                        help="block kind(s) to measure, default: all")
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES,
+                        help="number of gates")
+    parser.add_argument("--depth", type=int, help="block size, default: per kind")
+    parser.add_argument("--cycles", type=int, default=10,
+                        help="number of input toggles for the event rate")
+    args = parser.parse_args()
+
+    print(f"{'kind':<15} {'gates':>9} {'build[s]':>10} {'check[s]':>10} "
+          f"{'power[s]':>10} {'events':>10} {'events/s':>12} {'B/gate':>10}")
+    run(args.kind or list(DEFAULT_DEPTHS), args.sizes, args.depth, args.cycles)
+
+
+if __name__ == '__main__':
+    main()
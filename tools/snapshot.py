@@ -0,0 +1,272 @@
+"""Snapshot and restore of the board state
+
+A snapshot is a compact byte string of the whole board state:
+
+- the internal state of every HW element (e.g. the input pins and state bits
+  of the ICs, LED on/off and on-time, capacitor voltages and the simulated
+  time of their solver)
+- the edges of the clocks (see boardsections.clock.clocks)
+- the level of every wire (2 bits for the 4 states)
+- the ROM image, i.e. the dip switches
+
+Restoring sets the same attributes back without emitting any signal, so the
+board continues from the exact same state, e.g. to rewind in a debugger or to
+resume a long run after a crash.
+
+Format
+------
+Header: magic, format version, layout checksum, number of state bits, number
+of analogue values. Then the state bits, 8 per byte, followed by the analogue
+values (e.g. LED and analogue wire voltages, clock edges) as doubles.
+
+The layout checksum is calculated from the element and clock classes and the
+wire names of the netlist, a snapshot can only be restored to a board with the same layout.
+
+Usage
+-----
+data = snapshot()
+...
+restore(data)
+"""
+
+from array import array
+from collections.abc import Callable, Iterator
+import os
+import struct
+import zlib
+
+from boardsections.clock import AstableMultivibrator, clocks
+from boardsections.cpu import Xor
+from boardsections.hardware.analogue import RcNode
+from boardsections.hardware.dipswitches import DipSwitch
+from boardsections.hardware.iclib import IcUnit
+from boardsections.hardware.leds import Led
+from boardsections.hardware import wiring
+from boardsections.reset import ResetButton
+from boardsections.rom import Rom
+from tools import netlist
+from typedefinitions import TTL, Voltage
+
+
+MAGIC = b"OBPS"
+VERSION = 5
+HEADER = struct.Struct("<4sHIII")
+
+# TTL level by value
+_LEVELS = tuple(TTL)
+
+
+####################################
+## State codecs of the HW elements
+####################################
+# An encoder appends the state bits and analogue values of an element, the
+# decoder sets the state of the element from the next bits and values.
+
+# TTL levels take 2 bits
+
+def _encode_level(level: TTL, bits: bytearray) -> None:
+    bits.extend((level.value >> 1, level.value & 1))
+
+def _decode_level(bits: Iterator[int]) -> TTL:
+    return _LEVELS[next(bits) << 1 | next(bits)]
+
+def _encode_ic_unit(unit: IcUnit, bits: bytearray, values: list[float]) -> None:
+    bits.append(unit.powered)
+    for value, count in (
+        (unit.pins, len(unit.part.inputs)),
+        (unit.unknown_pins, len(unit.part.inputs)),
+        (unit.state, len(unit.part.state)),
+        (unit.unknown_state, len(unit.part.state)),
+    ):
+        bits.extend(value >> bit & 1 for bit in range(count))
+
+def _decode_ic_unit(unit: IcUnit, bits: Iterator[int], values: Iterator[float]) -> None:
+    unit.powered = bool(next(bits))
+    unit.pins, unit.unknown_pins, unit.state, unit.unknown_state = (
+        sum(next(bits) << bit for bit in range(count))
+        for count in (
+            len(unit.part.inputs), len(unit.part.inputs),
+            len(unit.part.state), len(unit.part.state),
+        )
+    )
+
+def _encode_led(led: Led, bits: bytearray, values: list[float]) -> None:
+    bits.append(led.is_on)
+    values.extend((led.anode_level.level, led.catode_level.level, led._on_time, led._updated))
+
+def _decode_led(led: Led, bits: Iterator[int], values: Iterator[float]) -> None:
+    led.is_on = bool(next(bits))
+    led.anode_level = Voltage(next(values))
+    led.catode_level = Voltage(next(values))
+    led._on_time = next(values)
+    led._updated = next(values)
+
+def _encode_rom(rom: Rom, bits: bytearray, values: list[float]) -> None:
+    _encode_level(rom.address_value, bits)
+    for dipswitch in rom.dip_switches:
+        bits.extend((dipswitch.switch_one, dipswitch.switch_two))
+
+def _decode_rom(rom: Rom, bits: Iterator[int], values: Iterator[float]) -> None:
+    rom.address_value = _decode_level(bits)
+    for address in range(len(rom.dip_switches)):
+        rom.dip_switches[address] = DipSwitch(next(bits), next(bits))
+
+def _encode_reset(reset: ResetButton, bits: bytearray, values: list[float]) -> None:
+    bits.extend((reset.powered, reset.pressed))
+
+def _decode_reset(reset: ResetButton, bits: Iterator[int], values: Iterator[float]) -> None:
+    reset.powered = bool(next(bits))
+    reset.pressed = bool(next(bits))
+
+def _encode_rc_node(node: RcNode, bits: bytearray, values: list[float]) -> None:
+    solver, index = node.solver, node.index
+    side = int(solver.side[index])
+    bits.extend((side < 0, side > 0))
+    # The solver is shared by its nodes, each one has its time
+    values.extend((float(solver.voltage[index]), float(solver.target[index]), solver.steps))
+
+def _decode_rc_node(node: RcNode, bits: Iterator[int], values: Iterator[float]) -> None:
+    solver, index = node.solver, node.index
+    unknown, above = next(bits), next(bits)
+    solver.side[index] = -1 if unknown else above
+    solver.voltage[index] = next(values)
+    solver.target[index] = next(values)
+    solver.steps = int(next(values))
+
+def _encode_clock(clock: AstableMultivibrator, bits: bytearray, values: list[float]) -> None:
+    values.append(clock.edges)
+
+def _decode_clock(clock: AstableMultivibrator, bits: Iterator[int], values: Iterator[float]) -> None:
+    clock.edges = int(next(values))
+
+def _encode_nothing(element: object, bits: bytearray, values: list[float]) -> None:
+    pass
+
+def _decode_nothing(element: object, bits: Iterator[int], values: Iterator[float]) -> None:
+    pass
+
+
+# Encoder and decoder by element class (subclasses use the codec of their base)
+CODECS: dict[type, tuple[Callable, Callable]] = {
+    IcUnit: (_encode_ic_unit, _decode_ic_unit),
+    Led: (_encode_led, _decode_led),
+    Rom: (_encode_rom, _decode_rom),
+    ResetButton: (_encode_reset, _decode_reset),
+    RcNode: (_encode_rc_node, _decode_rc_node),
+    AstableMultivibrator: (_encode_clock, _decode_clock),
+    Xor: (_encode_nothing, _decode_nothing),  # the NAND gates have the state
+}
+
+
+class _Plan:
+    """The codecs of the elements, the clocks and the wires of a netlist in
+    snapshot order"""
+    def __init__(self, board: netlist.Netlist, board_clocks: list[AstableMultivibrator]) -> None:
+        self.clocks = board_clocks
+        self.encoders: list[tuple[Callable, object]] = []
+        self.decoders: list[tuple[Callable, object]] = []
+        for element in [*board.elements, *board_clocks]:
+            encode, decode = _codec(type(element))
+            self.encoders.append((encode, element))
+            self.decoders.append((decode, element))
+        self.digital_wires = [wire for wire in board.wires if not wire.analogue]
+        self.analogue_wires = [wire for wire in board.wires if wire.analogue]
+        layout = "\n".join(
+            [type(element).__qualname__ for element in [*board.elements, *board_clocks]] +
+            [wire.name for wire in board.wires]
+        )
+        self.layout_crc = zlib.crc32(layout.encode())
+
+
+# The plan of the last used netlist
+_cached: tuple[netlist.Netlist, _Plan] | None = None
+
+
+def _codec(klass: type) -> tuple[Callable, Callable]:
+    for base in klass.__mro__:
+        if base in CODECS:
+            return CODECS[base]
+    raise SystemError(f"{klass.__qualname__} has no snapshot codec")
+
+def _plan() -> _Plan:
+    global _cached
+    board = netlist.current()
+    board_clocks = clocks()
+    if _cached is None or _cached[0] is not board or _cached[1].clocks != board_clocks:
+        _cached = (board, _Plan(board, board_clocks))
+    return _cached[1]
+
+def snapshot() -> bytes:
+    """The packed state of the board"""
+    plan = _plan()
+    bits = bytearray()
+    values: list[float] = []
+    for encode, element in plan.encoders:
+        encode(element, bits, values)
+    for wire in plan.digital_wires:
+        _encode_level(wire.current_level, bits)
+    values.extend(wire.current_level.level for wire in plan.analogue_wires)
+
+    header = HEADER.pack(MAGIC, VERSION, plan.layout_crc, len(bits), len(values))
+    return header + _pack_bits(bits) + array("d", values).tobytes()
+
+def restore(data: bytes) -> None:
+    """Set the board state from a snapshot, without emitting signals"""
+    if wiring.settling():
+        raise SystemError("Cannot restore a snapshot while the wires are settling")
+    plan = _plan()
+    magic, version, layout_crc, bit_count, value_count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a board snapshot or unsupported version")
+    if layout_crc != plan.layout_crc:
+        raise ValueError("The snapshot was taken of a board with a different layout")
+    packed_size = (bit_count + 7) // 8
+    bits = iter(_unpack_bits(data[HEADER.size:HEADER.size + packed_size], bit_count))
+    values = iter(array("d", data[HEADER.size + packed_size:]))
+    if len(data) - HEADER.size - packed_size != value_count * 8:
+        raise ValueError("Truncated snapshot")
+
+    for decode, element in plan.decoders:
+        decode(element, bits, values)
+    for wire in plan.digital_wires:
+        wire.current_level = _decode_level(bits)
+    for wire in plan.analogue_wires:
+        wire.current_level = Voltage(next(values))
+
+def save(path: str | os.PathLike) -> None:
+    """Write a snapshot into a file, replacing the previous one atomically"""
+    temp_path = f"{os.fspath(path)}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(snapshot())
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+def load(path: str | os.PathLike) -> None:
+    """Restore the board state from a snapshot file"""
+    with open(path, "rb") as file:
+        restore(file.read())
+
+def _pack_bits(bits: bytearray) -> bytes:
+    """Pack 0/1 bytes into bits, 8 per byte (LSB first)
+
+    The k-th bits of the bytes are collected by slicing, so the packing runs
+    on 8 big integers instead of a Python loop over the bits.
+    """
+    size = (len(bits) + 7) // 8
+    bits = bits + bytes(size * 8 - len(bits))
+    packed = 0
+    for bit in range(8):
+        packed |= int.from_bytes(bits[bit::8], "little") << bit
+    return packed.to_bytes(size, "little")
+
+def _unpack_bits(data: bytes, count: int) -> bytearray:
+    """Unpack bits (LSB first) into 0/1 bytes"""
+    size = len(data)
+    packed = int.from_bytes(data, "little")
+    ones = int.from_bytes(b"\x01" * size, "little")
+    bits = bytearray(size * 8)
+    for bit in range(8):
+        bits[bit::8] = ((packed >> bit) & ones).to_bytes(size, "little")
+    del bits[count:]
+    return bits
@@ -0,0 +1,116 @@
+"""Startup benchmark of the headless simulator
+
+Measure the startup of the simulator without the interactive parts, e.g. of
+a worker process (see tools/fault_simulation.py), each in a fresh
+interpreter:
+
+- import time of the module of the board builder (main by default)
+- build time of the board
+
+The interactive and optional parts (Qt, NumPy, the event loop, the metrics
+server) are only loaded on first use, so the headless startup must not load
+them (LAZY_MODULES).
+
+The median of the runs must be within the budget, otherwise the benchmark
+fails, so it can be a gate of the changes.
+
+Usage
+-----
+python -m tools.startup_benchmark
+python -m tools.startup_benchmark --build my_board:build --runs 20
+"""
+
+import argparse
+import dataclasses
+import os
+import statistics
+import subprocess
+import sys
+
+
+# Budget of the median of the runs (seconds)
+IMPORT_BUDGET = 0.100
+BUILD_BUDGET = 0.020
+
+# Modules the headless startup must not load
+LAZY_MODULES = (
+    "PySide6",
+    "numpy",
+    "asyncio",
+    "http.server",
+    "boardsections.control",
+    "boardsections.display",
+    "boardsections.hardware.analogue",
+    "tools.metrics",
+)
+
+# Run in the fresh interpreter, prints the import and the build time, then the
+# loaded lazy modules
+_PROBE = """
+import importlib, sys, time
+start = time.perf_counter()
+module = importlib.import_module({module!r})
+imported = time.perf_counter()
+getattr(module, {function!r})()
+built = time.perf_counter()
+print(imported - start, built - imported)
+print(*[name for name in {lazy!r} if name in sys.modules])
+"""
+
+
+@dataclasses.dataclass
+class Measurement:
+    import_s: float
+    build_s: float
+    lazy_loaded: list[str]
+
+
+def measure(build: str) -> Measurement:
+    """Import the "module:function" and build the board in a new interpreter"""
+    module, function = build.split(":")
+    code = _PROBE.format(module=module, function=function, lazy=LAZY_MODULES)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True,
+    ).stdout.splitlines()
+    import_s, build_s = map(float, output[0].split())
+    return Measurement(import_s, build_s, output[1].split())
+
+def run(build: str, runs: int) -> list[str]:
+    """Measure the runs (after a warm-up one), return the budget violations"""
+    measure(build)  # compiles the bytecode caches
+    measurements = [measure(build) for _ in range(runs)]
+    import_s = statistics.median(m.import_s for m in measurements)
+    build_s = statistics.median(m.build_s for m in measurements)
+    print(f"import: {import_s * 1e3:.1f} ms median, "
+          f"{max(m.import_s for m in measurements) * 1e3:.1f} ms max "
+          f"(budget {IMPORT_BUDGET * 1e3:.0f} ms)")
+    print(f"build:  {build_s * 1e3:.1f} ms median, "
+          f"{max(m.build_s for m in measurements) * 1e3:.1f} ms max "
+          f"(budget {BUILD_BUDGET * 1e3:.0f} ms)")
+
+    violations = []
+    if import_s > IMPORT_BUDGET:
+        violations.append(f"import {import_s * 1e3:.1f} ms over budget")
+    if build_s > BUILD_BUDGET:
+        violations.append(f"build {build_s * 1e3:.1f} ms over budget")
+    lazy_loaded = sorted({name for m in measurements for name in m.lazy_loaded})
+    if lazy_loaded:
+        violations.append(f"{lazy_loaded} loaded at startup")
+    return violations
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--build", default="main:build_board",
+                        help='"module:function" building the board')
+    parser.add_argument("--runs", type=int, default=10, help="number of fresh interpreters")
+    args = parser.parse_args()
+
+    violations = run(args.build, args.runs)
+    for violation in violations:
+        print(violation)
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == '__main__':
+    main()
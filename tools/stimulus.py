@@ -0,0 +1,256 @@
+"""Record and replay of the external stimuli
+
+The only external inputs of the board are:
+
+- the power switch of the PSU
+- the clock edges of the astable multivibrator
+- the ROM contents set by the dip switches
+- the reset button
+
+These are recorded (by default into memory, or streamed into a file) as a
+compact binary log, so that any run can be reproduced. The replay feeds the
+stimuli back as fast as possible (no sleeps), and verifies that the board
+goes through the same states.
+
+The log in memory is capped (MEMORY_LIMIT), only its head is kept, which can
+still be replayed. The log streamed into a file is not capped, and it is
+flushed after every stimulus, so a killed run leaves a replayable log. The
+board state is only checkpointed after every CHECKPOINT_INTERVAL stimuli, as
+a snapshot of the whole board costs far more than a clock edge, and when
+the log is closed. A replay without any checkpoint is not verified.
+
+Format
+------
+Header: magic, format version and checkpoint interval. Then fixed size
+records of virtual timestamp (number of clock edges so far), input id and
+value:
+
+- POWER: 1 for on, 0 for off
+- CLOCK: the new clock level
+- ROM: the dip switches, 2 bits per address (switch one is the higher bit)
+- RESET: 1 for pressing, 0 for releasing the reset button
+- CHECKPOINT: CRC32 of the board snapshot after the stimulus settled (or
+  when the log was closed)
+
+Usage
+-----
+stimulus.recorder.open("run.stim")   # stream to a file instead of memory
+...
+stimulus.recorder.close()
+log = stimulus.recorder.data   # (in memory recording)
+stimuli, checkpoints = stimulus.replay(log, build_board())
+"""
+
+from collections.abc import Iterator
+import logging
+import os
+import struct
+import zlib
+
+
+MAGIC = b"OBPR"
+VERSION = 2
+HEADER = struct.Struct("<4sHI")
+RECORD = struct.Struct("<QBI")
+
+# Input ids
+POWER = 0
+CLOCK = 1
+ROM = 2
+RESET = 3
+CHECKPOINT = 255
+
+# Stimuli between the checkpoints
+CHECKPOINT_INTERVAL = 1024
+
+# Bytes of the log kept in memory
+MEMORY_LIMIT = 1 << 20
+
+
+class ReplayMismatch(SystemError):
+    """The replayed run differs from the recorded one"""
+    def __init__(self, time: int, offset: int) -> None:
+        super().__init__(f"Replay differs from the record at clock edge {time} (byte {offset})")
+        self.time = time
+        self.offset = offset
+
+
+class StimulusLog:
+    """Recorder of the external stimuli
+
+    Checkpoints are written after every `checkpoint_interval` stimuli (0:
+    only when closed), as the snapshot of big boards takes time. The log in
+    memory stops growing at `memory_limit` bytes (`truncated` is set).
+    """
+    def __init__(
+        self,
+        checkpoint_interval: int = CHECKPOINT_INTERVAL,
+        memory_limit: int = MEMORY_LIMIT,
+    ) -> None:
+        self.checkpoint_interval = checkpoint_interval
+        self.memory_limit = memory_limit
+        self.data = bytearray()
+        self.truncated = False
+        self._file = None
+        self.clear()
+
+    def clear(self) -> None:
+        """Start a new, empty log in memory (the previous one is dropped)"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.data = bytearray(HEADER.pack(MAGIC, VERSION, self.checkpoint_interval))
+        self.truncated = False
+        self.time = 0
+        self._stimuli = 0
+        self._checkpointed = 0
+
+    def open(self, path: str | os.PathLike) -> None:
+        """Start a new log streamed into a file"""
+        self.close()
+        self.clear()
+        self._file = open(path, "wb")
+        self._file.write(self.data)
+        self._file.flush()
+        self.data = bytearray()
+
+    def close(self) -> None:
+        """Finish the log by a checkpoint of the final state"""
+        if self._stimuli > self._checkpointed:
+            self._write_checkpoint()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def record(self, input_id: int, value: int) -> None:
+        """Record a stimulus"""
+        if input_id == CLOCK:
+            self.time += 1
+        self._write(input_id, value)
+
+    def checkpoint(self) -> None:
+        """Record the digest of the board state after a stimulus (if due)"""
+        self._stimuli += 1
+        if self.checkpoint_interval and not self._stimuli % self.checkpoint_interval:
+            self._write_checkpoint()
+        if self._file is not None:
+            self._file.flush()
+
+    def _write_checkpoint(self) -> None:
+        from tools import snapshot
+
+        self._write(CHECKPOINT, zlib.crc32(snapshot.snapshot()))
+        self._checkpointed = self._stimuli
+
+    def _write(self, input_id: int, value: int) -> None:
+        if self._file is None:
+            if len(self.data) + RECORD.size > self.memory_limit:
+                if not self.truncated:
+                    self.truncated = True
+                    logging.warning("Stimulus log in memory truncated at %d bytes", len(self.data))
+                return
+            self.data += RECORD.pack(self.time, input_id, value)
+        else:
+            self._file.write(RECORD.pack(self.time, input_id, value))
+
+
+# The recorder of the simulation
+recorder = StimulusLog()
+
+
+def record(input_id: int, value: int) -> None:
+    recorder.record(input_id, value)
+
+def checkpoint() -> None:
+    recorder.checkpoint()
+
+def pack_rom(dip_switches: list) -> int:
+    """The ROM value of the dip switches"""
+    value = 0
+    for address, dipswitch in enumerate(dip_switches):
+        value |= (dipswitch.switch_one << 1 | dipswitch.switch_two) << 2*address
+    return value
+
+def checkpoint_interval(data: bytes) -> int:
+    """The checkpoint interval of a log"""
+    if len(data) < HEADER.size:
+        raise ValueError("Not a stimulus log, no header")
+    magic, version, interval = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a stimulus log or unsupported version")
+    return interval
+
+def records(data: bytes) -> Iterator[tuple[int, int, int]]:
+    """The (time, input id, value) records of a log
+
+    A partly written last record (e.g. the recording process crashed) is
+    skipped with a warning.
+    """
+    checkpoint_interval(data)
+    body = memoryview(data)[HEADER.size:]
+    tail = len(body) % RECORD.size
+    if tail:
+        logging.warning("Stimulus log truncated, the last %d bytes are not a whole record", tail)
+    return RECORD.iter_unpack(body[:len(body) - tail])
+
+def replay(data: bytes, board) -> tuple[int, int]:
+    """Feed the recorded stimuli to a freshly built board
+
+    The board must have `psu`, `clock`, `rom` and `reset` attributes. The stimuli are
+    applied through the same methods that recorded them (with the checkpoint
+    interval of the log), so the recorder builds the same log again. Its new
+    bytes are compared to the original after every stimulus (then dropped),
+    and ReplayMismatch is raised at the first difference. The checkpoint
+    written when the log was closed is compared to the board state at its
+    place.
+
+    Returns the number of replayed stimuli and of the verified checkpoints.
+    Without checkpoints only the stimuli were compared, not the board state.
+    """
+    from boardsections.hardware.dipswitches import DipSwitch
+    from tools import snapshot
+    from typedefinitions import TTL
+
+    recorder.checkpoint_interval = checkpoint_interval(data)
+    recorder.clear()
+    stimuli = 0
+    checkpoints = 0
+    verified = 0
+    for index, (time, input_id, value) in enumerate(records(data)):
+        if input_id == POWER:
+            board.psu.power_switch(on=bool(value))
+        elif input_id == CLOCK:
+            board.clock.edge(TTL(value))
+        elif input_id == ROM:
+            board.rom.programming([
+                DipSwitch((value >> 2*address + 1) & 1, (value >> 2*address) & 1)
+                for address in range(len(board.rom.dip_switches))
+            ])
+        elif input_id == RESET:
+            if value:
+                board.reset.press()
+            else:
+                board.reset.release()
+        elif input_id == CHECKPOINT:
+            checkpoints += 1
+            offset = HEADER.size + index * RECORD.size
+            if offset >= verified:
+                # Not logged again by the replay, i.e. written when closed
+                if value != zlib.crc32(snapshot.snapshot()):
+                    raise ReplayMismatch(time, offset)
+                verified = offset + RECORD.size
+            continue
+        else:
+            raise ValueError(f"Unknown input id {input_id} at clock edge {time}")
+        stimuli += 1
+        # Verify the bytes logged since the previous stimulus, then drop them
+        replayed = recorder.data
+        expected = data[verified:verified + len(replayed)]
+        if replayed != expected:
+            offset = 0
+            while offset < min(len(replayed), len(expected)) and replayed[offset] == expected[offset]:
+                offset += 1
+            raise ReplayMismatch(time, verified + offset)
+        verified += len(replayed)
+        recorder.data.clear()
+    return stimuli, checkpoints
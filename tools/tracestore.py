@@ -0,0 +1,409 @@
+"""Columnar, compressed trace of the wire level changes
+
+The trace writer is a wiring tracer (see wiring.add_tracer), so it gets every
+delivered level change of every wire. The time of a change is its event
+number, i.e. the number of changes delivered before it since the trace
+started. The rising edges of the clock are indexed, so a trace can be
+queried by clock cycles.
+
+The changes are written in chunks of CHUNK_EVENTS events, column-wise: every
+wire changing in a chunk has
+
+- a times column: the times as deltas (from the start of the chunk, then from
+  the previous change of the wire), 16 bits each
+- a levels column: the TTL levels packed 4 per byte (2 bits for the 4
+  states), or the voltages of the analogue wires as doubles
+
+Each chunk also starts with a keyframe: the levels of all wires at the start
+of the chunk. Every column and keyframe is compressed separately by a
+standard library codec (CODECS), so the reader only decompresses what it
+reads:
+
+- the history of one wire: its columns in the chunks
+- the levels of all wires at a time (e.g. a clock cycle): the keyframe and
+  the columns of one chunk
+
+Format
+------
+Header: magic, format version, codec, chunk size (events). Then the data of
+the chunks (keyframes and columns), followed by the tables, which are not
+compressed, so they are read in place from the memory-mapped file:
+
+- wires: analogue flag, name length and name of each wire, in order of their
+  first level change (or of the soldered wires when the trace started)
+- cycles: the time of each rising edge of the clock, 64 bits each
+- chunks: CHUNK records, the chunk of a time is time // chunk size
+- columns: COLUMN records of the chunks, ordered by wire index per chunk
+
+Trailer: the counts and offsets of the tables, and the magic again.
+
+Usage
+-----
+writer = TraceWriter("run.trace", clock=board.clock.output)
+writer.start()
+...
+writer.close()
+
+with Trace("run.trace") as trace:
+    for time, level in trace.history("register_out_q"):
+        ...
+    levels = trace.levels_at_cycle(1000)  # by wire, see trace.wires
+
+python -m tools.tracestore run.trace --wire register_out_q --cycle 1000
+"""
+
+from array import array
+import argparse
+import bz2
+from collections.abc import Callable, Iterator
+import itertools
+import lzma
+import math
+import mmap
+import os
+import struct
+import zlib
+
+from boardsections.hardware import wiring
+from boardsections.hardware.wiring import Wire
+from typedefinitions import TTL, Voltage
+
+
+MAGIC = b"OBTR"
+VERSION = 1
+HEADER = struct.Struct("<4sHBI")
+# First event, events, keyframe offset, keyframe length, wires in the
+# keyframe, first column index, column count
+CHUNK = struct.Struct("<QIQIIQI")
+# Wire index, level changes, offset, times length, levels length
+COLUMN = struct.Struct("<IIQII")
+# Wire count and offset, cycle count and offset, chunk count and offset,
+# column count and offset, magic
+TRAILER = struct.Struct("<QQQQQQQQ4s")
+WIRE = struct.Struct("<BH")
+
+# Events of a chunk, the time deltas take 16 bits
+CHUNK_EVENTS = 1 << 16
+
+# (Name, compress, decompress) by codec id
+CODECS: dict[int, tuple[str, Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    0: ("zlib", zlib.compress, zlib.decompress),
+    1: ("bz2", bz2.compress, bz2.decompress),
+    2: ("lzma", lzma.compress, lzma.decompress),
+}
+
+# TTL level by value
+_LEVELS = tuple(TTL)
+
+# The 4 levels of a packed byte
+_UNPACKED = [bytes((byte & 3, byte >> 2 & 3, byte >> 4 & 3, byte >> 6)) for byte in range(256)]
+
+
+def _pack_levels(values: bytes) -> bytes:
+    """TTL level values packed 4 per byte"""
+    values = bytes(values) + bytes(-len(values) % 4)
+    return bytes(
+        a | b << 2 | c << 4 | d << 6
+        for a, b, c, d in zip(values[0::4], values[1::4], values[2::4], values[3::4])
+    )
+
+def _unpack_levels(data: bytes, count: int) -> bytes:
+    return b"".join(_UNPACKED[byte] for byte in data)[:count]
+
+
+class TraceWriter:
+    """Stream the wire level changes into a trace file"""
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        clock: Wire | None = None,
+        codec: str = "zlib",
+        chunk_events: int = CHUNK_EVENTS,
+    ) -> None:
+        if not 0 < chunk_events <= CHUNK_EVENTS:
+            raise ValueError(f"At most {CHUNK_EVENTS} events per chunk")
+        codec_ids = {name: codec_id for codec_id, (name, _, _) in CODECS.items()}
+        self._codec_id = codec_ids[codec]
+        self._compress = CODECS[self._codec_id][1]
+        self.clock = clock
+        self.chunk_events = chunk_events
+        # Events so far
+        self.events = 0
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, self._codec_id, chunk_events))
+        # Wire indices, names and analogue flags
+        self._wires: dict[Wire, int] = {}
+        self._wire_table = bytearray()
+        self._analogue: list[bool] = []
+        # The level (value) of every wire at the start of the current chunk
+        self._keyframe: list[int | float] = []
+        # The times and levels of the wires changed in the current chunk
+        self._columns: dict[int, tuple[array, bytearray | array]] = {}
+        self._cycles = array("Q")
+        self._chunk_table = bytearray()
+        self._column_table = bytearray()
+        self._column_count = 0
+        self._chunk_first = 0
+
+    def start(self) -> None:
+        """Trace the level changes from now on, starting from the current
+        levels of the soldered wires"""
+        for wire in wiring.soldered_wires():
+            if wire not in self._wires:
+                self._add(wire, wire.current_level)
+        wiring.add_tracer(self._trace)
+
+    def stop(self) -> None:
+        wiring.remove_tracer(self._trace)
+
+    def close(self) -> None:
+        """Stop, write the last chunk and the tables"""
+        if self._file is None:
+            return
+        self.stop()
+        if self.events > self._chunk_first or not self._chunk_table:
+            self._flush()
+        wire_offset = self._file.tell()
+        self._file.write(self._wire_table)
+        cycle_offset = self._file.tell()
+        self._file.write(self._cycles.tobytes())
+        chunk_offset = self._file.tell()
+        self._file.write(self._chunk_table)
+        column_offset = self._file.tell()
+        self._file.write(self._column_table)
+        self._file.write(TRAILER.pack(
+            len(self._analogue), wire_offset,
+            len(self._cycles), cycle_offset,
+            len(self._chunk_table) // CHUNK.size, chunk_offset,
+            self._column_count, column_offset,
+            MAGIC,
+        ))
+        self._file.close()
+        self._file = None
+
+    def _add(self, wire: Wire, level: TTL | Voltage | None = None) -> int:
+        """Index a new wire, its level before the trace is unknown by default"""
+        wire_idx = len(self._analogue)
+        self._wires[wire] = wire_idx
+        name = wire.name.encode()
+        self._wire_table += WIRE.pack(wire.analogue, len(name)) + name
+        self._analogue.append(wire.analogue)
+        if wire.analogue:
+            self._keyframe.append(math.nan if level is None else level.level)
+        else:
+            self._keyframe.append(TTL.X.value if level is None else level.value)
+        return wire_idx
+
+    def _trace(self, wire: Wire, level: TTL | Voltage) -> None:
+        wire_idx = self._wires.get(wire)
+        if wire_idx is None:
+            wire_idx = self._add(wire)
+        column = self._columns.get(wire_idx)
+        if column is None:
+            column = self._columns[wire_idx] = (
+                array("Q"), array("d") if wire.analogue else bytearray())
+        column[0].append(self.events)
+        column[1].append(level.level if wire.analogue else level.value)
+        if wire is self.clock and level is TTL.H:
+            self._cycles.append(self.events)
+        self.events += 1
+        if self.events - self._chunk_first == self.chunk_events:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Write the keyframe and the columns of the current chunk"""
+        first = self._chunk_first
+        keyframe = self._compress(
+            _pack_levels(bytes(0 if analogue else value
+                               for value, analogue in zip(self._keyframe, self._analogue)))
+            + array("d", (value for value, analogue in zip(self._keyframe, self._analogue)
+                          if analogue)).tobytes()
+        )
+        keyframe_offset = self._file.tell()
+        self._file.write(keyframe)
+        self._chunk_table += CHUNK.pack(
+            first, self.events - first, keyframe_offset, len(keyframe), len(self._keyframe),
+            self._column_count, len(self._columns),
+        )
+        for wire_idx in sorted(self._columns):
+            times, levels = self._columns[wire_idx]
+            deltas = array("H", (time - previous for time, previous in zip(times, [first, *times])))
+            times_data = self._compress(deltas.tobytes())
+            if self._analogue[wire_idx]:
+                levels_data = self._compress(levels.tobytes())
+            else:
+                levels_data = self._compress(_pack_levels(levels))
+            self._column_table += COLUMN.pack(
+                wire_idx, len(times), self._file.tell(), len(times_data), len(levels_data))
+            self._file.write(times_data)
+            self._file.write(levels_data)
+            self._keyframe[wire_idx] = levels[-1]
+        self._column_count += len(self._columns)
+        self._columns.clear()
+        self._chunk_first = self.events
+
+
+class Trace:
+    """Read a trace file, memory-mapped"""
+    def __init__(self, path: str | os.PathLike) -> None:
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, codec_id, self.chunk_events = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a trace or unsupported version")
+        self._decompress = CODECS[codec_id][2]
+        (wire_count, wire_offset, self._cycle_count, self._cycle_offset,
+         self._chunk_count, self._chunk_offset, _, self._column_offset,
+         magic) = TRAILER.unpack_from(self._map, len(self._map) - TRAILER.size)
+        if magic != MAGIC:
+            raise ValueError("Truncated trace, the writer was not closed")
+        # The wire names and analogue flags by wire index
+        self.wires: list[str] = []
+        self.analogue: list[bool] = []
+        offset = wire_offset
+        for _ in range(wire_count):
+            analogue, length = WIRE.unpack_from(self._map, offset)
+            offset += WIRE.size
+            self.wires.append(self._map[offset:offset + length].decode())
+            self.analogue.append(bool(analogue))
+            offset += length
+        first, events = self._chunk(self._chunk_count - 1)[:2]
+        self.events = first + events
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "Trace":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    @property
+    def cycles(self) -> int:
+        """The number of rising clock edges"""
+        return self._cycle_count
+
+    def cycle_time(self, cycle: int) -> int:
+        """The time (event number) of the rising clock edge of the cycle"""
+        if not 0 <= cycle < self._cycle_count:
+            raise IndexError(f"Cycle {cycle} not in the trace of {self._cycle_count} cycles")
+        return struct.unpack_from("<Q", self._map, self._cycle_offset + 8 * cycle)[0]
+
+    def wire_index(self, name: str) -> int:
+        try:
+            return self.wires.index(name)
+        except ValueError:
+            raise KeyError(f"{name} wire not in the trace") from None
+
+    def history(
+        self, name: str, start: int = 0, stop: int | None = None,
+    ) -> Iterator[tuple[int, TTL | Voltage]]:
+        """The (time, level) changes of the wire from the start until the
+        stop time (excluded)"""
+        wire_idx = self.wire_index(name)
+        stop = self.events if stop is None else min(stop, self.events)
+        for chunk_idx in range(start // self.chunk_events, self._chunk_count):
+            first = self._chunk(chunk_idx)[0]
+            if first >= stop:
+                break
+            column = self._column(chunk_idx, wire_idx)
+            if column is None:
+                continue
+            for time, level in zip(*self._decode_column(first, wire_idx, column)):
+                if start <= time < stop:
+                    yield time, level
+
+    def levels_at(self, time: int) -> list[TTL | Voltage]:
+        """The levels of the wires (by wire index) before the change at the
+        time, i.e. after `time` changes"""
+        if not 0 <= time <= self.events:
+            raise IndexError(f"Time {time} not in the trace of {self.events} events")
+        chunk_idx = min(time // self.chunk_events, self._chunk_count - 1)
+        first, _, offset, length, keyframe_wires, first_column, columns = self._chunk(chunk_idx)
+        levels = self._decode_keyframe(offset, length, keyframe_wires)
+        levels += [
+            Voltage(math.nan) if analogue else TTL.X
+            for analogue in self.analogue[keyframe_wires:]
+        ]
+        for column_idx in range(first_column, first_column + columns):
+            column = COLUMN.unpack_from(self._map, self._column_offset + column_idx * COLUMN.size)
+            for change_time, level in zip(*self._decode_column(first, column[0], column)):
+                if change_time >= time:
+                    break
+                levels[column[0]] = level
+        return levels
+
+    def levels_at_cycle(self, cycle: int) -> list[TTL | Voltage]:
+        """The levels of the wires right before the rising edge of the cycle"""
+        return self.levels_at(self.cycle_time(cycle))
+
+    def _chunk(self, chunk_idx: int) -> tuple[int, int, int, int, int, int, int]:
+        return CHUNK.unpack_from(self._map, self._chunk_offset + chunk_idx * CHUNK.size)
+
+    def _column(self, chunk_idx: int, wire_idx: int) -> tuple[int, int, int, int, int] | None:
+        """The column record of the wire in the chunk (binary search)"""
+        *_, first_column, columns = self._chunk(chunk_idx)
+        low, high = first_column, first_column + columns
+        while low < high:
+            middle = (low + high) // 2
+            column = COLUMN.unpack_from(self._map, self._column_offset + middle * COLUMN.size)
+            if column[0] == wire_idx:
+                return column
+            if column[0] < wire_idx:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def _decode_keyframe(self, offset: int, length: int, wires: int) -> list[TTL | Voltage]:
+        data = self._decompress(self._map[offset:offset + length])
+        packed = (wires + 3) // 4
+        values = _unpack_levels(data[:packed], wires)
+        voltages = iter(array("d", data[packed:]))
+        return [
+            Voltage(next(voltages)) if analogue else _LEVELS[value]
+            for value, analogue in zip(values, self.analogue)
+        ]
+
+    def _decode_column(
+        self, first: int, wire_idx: int, column: tuple[int, int, int, int, int],
+    ) -> tuple[Iterator[int], list[TTL | Voltage]]:
+        """The times and levels of a column"""
+        _, count, offset, times_length, levels_length = column
+        deltas = array("H", self._decompress(self._map[offset:offset + times_length]))
+        times = itertools.islice(itertools.accumulate(deltas, initial=first), 1, None)
+        offset += times_length
+        data = self._decompress(self._map[offset:offset + levels_length])
+        if self.analogue[wire_idx]:
+            levels = [Voltage(volts) for volts in array("d", data)]
+        else:
+            levels = [_LEVELS[value] for value in _unpack_levels(data, count)]
+        return times, levels
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("trace", help="trace file")
+    parser.add_argument("--wire", action="append", default=[], help="print the changes of the wire")
+    parser.add_argument("--cycle", type=int, action="append", default=[],
+                        help="print the levels before the rising edge of the cycle")
+    args = parser.parse_args()
+
+    with Trace(args.trace) as trace:
+        size = os.path.getsize(args.trace)
+        print(f"{trace.events} events, {len(trace.wires)} wires, {trace.cycles} cycles, "
+              f"{size} bytes ({size / max(trace.events, 1):.2f} bytes/event)")
+        for name in args.wire:
+            print(f"{name}:")
+            for time, level in trace.history(name):
+                print(f"  {time:>12} {level}")
+        for cycle in args.cycle:
+            print(f"cycle {cycle} (time {trace.cycle_time(cycle)}):")
+            for name, level in zip(trace.wires, trace.levels_at_cycle(cycle)):
+                print(f"  {name} {level}")
+
+
+if __name__ == '__main__':
+    main()
@@ -20,43 +20,102 @@ input connected.
 
 After all HW element definitions and connections are done, the check() verifies
 that all inputs are connected.
+
+Registry
+--------
+Every input of every HW element instance gets an integer port handle. The
+inputs of an instance have consecutive handles, so the handle of an input is
+the first handle of the instance plus the index of the input in its class.
+The connection states are stored in a bytearray indexed by the handle.
+
+The instances are only weakly referenced. When an instance is garbage
+collected, its inputs are released, i.e. they are not reported as
+not-connected any more, and its block of port handles is reused by the next
+instance with the same number of inputs. So building boards again and again
+in one process (e.g. benchmarks) does not grow the registry beyond the
+largest set of live instances. A released handle cannot be soldered any
+more: the wires keep the instances of their inputs alive.
+
+The number of not connected inputs is maintained while registering and
+connecting, so check() does not need to go through all inputs, unless there
+is an error to report.
 """
+from bisect import bisect_right
 from collections.abc import Callable
+import itertools
 from typing import Generic, TypeVar
+import weakref
 
 
 T_HW_ELEM = TypeVar("T_HW_ELEM")
 T_INPUT = TypeVar("T_INPUT", bound=Callable)
 
+# Port states
+NOT_CONNECTED = 0
+CONNECTED = 1
+RELEASED = 2
+
 # Collect methods decorated with @input of classes decorated with @hw_elem
 _inputs_by_classes: dict[str, list[str]] = {}
 
-# List function names found in @hw_elem classes
-_inputs_found_in_hwelem: list[str] = []
+# Fully qualified names of the classes decorated with @hw_elem
+_hw_elem_classes: set[str] = set()
+
+# Index of the classes containing @input methods, and their names by index
+_class_indices: dict[str, int] = {}
+_class_names: list[str] = []
+
+# (class index, input index) of the @input methods
+_ports_by_fn: dict[Callable, tuple[int, int]] = {}
+
+# State of the inputs by port handle
+_port_states = bytearray()
 
-# Collect "connected" flag of functions decorated with @input 
-_inputs_connected: dict[str, bool] = {}
+# Port handle of the @input functions outside classes
+_free_inputs: dict[Callable, int] = {}
+
+# First port handle of the instances by (id of instance, class index)
+_first_handles: dict[tuple[int, int], int] = {}
+
+# First port handles in increasing order with the related key of
+# _first_handles, to find the owner of a port handle
+_block_starts: list[int] = []
+_block_keys: list[tuple[int, int]] = []
+# Registration sequence number of the blocks, as the reused blocks are not
+# in registration order
+_block_orders: list[int] = []
+_registrations = itertools.count()
+
+# First port handles of the released blocks by their number of inputs
+_free_blocks: dict[int, list[int]] = {}
+
+# Weak reference of the instances by id and the class indices they registered
+_instances: dict[int, tuple[weakref.ref, list[int]]] = {}
+
+# Number of the registered, but not connected inputs
+_not_connected_count: int = 0
+
+# Incremented on every change of the registry, to validate cached analyses
+generation: int = 0
 
 
 def hw_elem(klass: Generic[T_HW_ELEM]) -> T_HW_ELEM:
     """Decorator for a HW element class
-    
+
     When this is called input decorators have already run and inputs_by_classes
     already contains the list of names of the input functions in this class.
 
     Augment the __init__() of the class, so that the @input instance methods
-    are enumerated. They are stored in inputs_connected with the key being the
-    repr() of the method, so that it is unique in all instances and the value
-    flag, by default, not connected.
+    get port handles. They are marked not connected by default.
     """
     fully_qual_class_name = f"{klass.__module__}.{klass.__qualname__}"
     if fully_qual_class_name not in _inputs_by_classes:
         raise SystemError(f"{fully_qual_class_name} missing @input methods, or should not be @hw_elem")
+    _hw_elem_classes.add(fully_qual_class_name)
+    class_idx = _class_indices[fully_qual_class_name]
     klass_init = klass.__init__
     def init(klass_self, *args, **kwargs):
-        for fn_name in _inputs_by_classes[fully_qual_class_name]:
-            _inputs_found_in_hwelem.append(f"{fully_qual_class_name}.{fn_name}")
-            _register_input_fn(getattr(klass_self, fn_name))
+        _register_instance(klass_self, class_idx)
         klass_init(klass_self, *args, **kwargs)
     klass.__init__ = init
     return klass
@@ -70,10 +129,11 @@ def input(fn: Generic[T_INPUT]) -> T_INPUT:
     Get the fully qualified name (module, parent classes) of the class,
     containing the input function. This is the key of the inputs_by_classes
     dict and it will store the names of the @input method names in this class.
+    The function gets the index of the class and its index in the class, so
+    that the port handle can be calculated from a bound method of an instance.
 
-    If this is not a method of a class, store it in inputs_connected with the
-    key being the repr() of the method, so that it is unique in all instances
-    and the value flag, by default, not connected.
+    If this is not a method of a class, it gets a port handle right away, and
+    it is marked not connected.
     """
     class_qual_sections = fn.__qualname__.split('.<locals>', 1)[0].rsplit('.')
     class_qual_sections.pop()
@@ -83,34 +143,152 @@ def input(fn: Generic[T_INPUT]) -> T_INPUT:
     class_qual_sections.insert(0, fn.__module__)
     fully_qual_class_name = ".".join(class_qual_sections)
     if fully_qual_class_name not in _inputs_by_classes:
-        _inputs_by_classes[fully_qual_class_name] = [fn.__name__]
-    else:
-        _inputs_by_classes[fully_qual_class_name].append(fn.__name__)
+        _class_indices[fully_qual_class_name] = len(_class_names)
+        _class_names.append(fully_qual_class_name)
+        _inputs_by_classes[fully_qual_class_name] = []
+    _ports_by_fn[fn] = (
+        _class_indices[fully_qual_class_name],
+        len(_inputs_by_classes[fully_qual_class_name]),
+    )
+    _inputs_by_classes[fully_qual_class_name].append(fn.__name__)
     return fn
 
 def _register_input_fn(fn: Callable) -> None:
     """Register the input and mark it not-connected-yet"""
-    fn_repr = fn.__repr__()
-    if fn_repr in _inputs_connected:
-        raise SystemError(f"{fn_repr} input already exists")
-    _inputs_connected[fn_repr] = False
-
-def input_connected(fn: Callable) -> None:
-    """Mark the (registered) input as connected"""
-    fn_repr = repr(fn)
-    if fn_repr not in _inputs_connected:
-        raise SystemError(f"{fn_repr} not an @input or its class is not a @hw_elem")
-    if _inputs_connected[fn_repr]:
-        raise SystemError(f"{fn_repr} @input already connected to an output")
-    _inputs_connected[fn_repr] = True
+    global _not_connected_count, generation
+    if fn in _free_inputs:
+        raise SystemError(f"{fn!r} input already exists")
+    _free_inputs[fn] = len(_port_states)
+    _port_states.append(NOT_CONNECTED)
+    _not_connected_count += 1
+    generation += 1
+
+def _register_instance(instance: object, class_idx: int) -> None:
+    """Register the inputs of the instance and mark them not-connected-yet"""
+    global _not_connected_count, generation
+    instance_id = id(instance)
+    key = (instance_id, class_idx)
+    if key in _first_handles:
+        raise SystemError(f"{_class_names[class_idx]} inputs of {instance!r} already exist")
+    input_count = len(_inputs_by_classes[_class_names[class_idx]])
+    free_blocks = _free_blocks.get(input_count)
+    if free_blocks:
+        first_handle = free_blocks.pop()
+        block = bisect_right(_block_starts, first_handle) - 1
+        _block_keys[block] = key
+        _block_orders[block] = next(_registrations)
+        _port_states[first_handle:first_handle + input_count] = bytes(input_count)
+    else:
+        first_handle = len(_port_states)
+        _block_starts.append(first_handle)
+        _block_keys.append(key)
+        _block_orders.append(next(_registrations))
+        _port_states.extend(bytes(input_count))
+    _first_handles[key] = first_handle
+    _not_connected_count += input_count
+    generation += 1
+
+    if instance_id in _instances:
+        _instances[instance_id][1].append(class_idx)
+    else:
+        ref = weakref.ref(instance, lambda _, instance_id=instance_id: _release(instance_id))
+        _instances[instance_id] = (ref, [class_idx])
+
+def _release(instance_id: int) -> None:
+    """Release the inputs of a garbage collected instance"""
+    global _not_connected_count, generation
+    generation += 1
+    _, class_indices = _instances.pop(instance_id)
+    for class_idx in class_indices:
+        first_handle = _first_handles.pop((instance_id, class_idx))
+        input_count = len(_inputs_by_classes[_class_names[class_idx]])
+        for handle in range(first_handle, first_handle + input_count):
+            if _port_states[handle] == NOT_CONNECTED:
+                _not_connected_count -= 1
+            _port_states[handle] = RELEASED
+        _free_blocks.setdefault(input_count, []).append(first_handle)
+
+def port_handle(fn: Callable) -> int:
+    """The port handle of a registered input"""
+    try:
+        class_idx, input_idx = _ports_by_fn[fn.__func__]
+        return _first_handles[(id(fn.__self__), class_idx)] + input_idx
+    except (AttributeError, KeyError):
+        pass
+    try:
+        return _free_inputs[fn]
+    except (KeyError, TypeError):
+        raise SystemError(f"{fn!r} not an @input or its class is not a @hw_elem") from None
+
+def input_connected(fn: Callable) -> int:
+    """Mark the (registered) input as connected and return its port handle"""
+    global _not_connected_count, generation
+    handle = port_handle(fn)
+    if _port_states[handle] != NOT_CONNECTED:
+        raise SystemError(f"{fn!r} @input already connected to an output")
+    _port_states[handle] = CONNECTED
+    _not_connected_count -= 1
+    generation += 1
+    return handle
+
+def registered_instances() -> list[tuple[object, int, list[str]]]:
+    """The live HW element instances in registration order
+
+    Each item is the instance, the first port handle of its inputs and the
+    names of these inputs. An instance of a @hw_elem subclass of a @hw_elem
+    class appears once per class.
+    """
+    instances = []
+    for block in sorted(range(len(_block_starts)), key=_block_orders.__getitem__):
+        first_handle, key = _block_starts[block], _block_keys[block]
+        instance_id, class_idx = key
+        if _first_handles.get(key) != first_handle:
+            continue  # released
+        instance = _instances[instance_id][0]()
+        if instance is not None:
+            instances.append(
+                (instance, first_handle, _inputs_by_classes[_class_names[class_idx]]))
+    return instances
+
+def port_owner(handle: int) -> tuple[object | None, str]:
+    """The instance (None for functions or released instances) and the
+    qualified name of the input by port handle"""
+    block = bisect_right(_block_starts, handle) - 1
+    if block >= 0:
+        instance_id, class_idx = _block_keys[block]
+        class_name = _class_names[class_idx]
+        input_idx = handle - _block_starts[block]
+        if input_idx < len(_inputs_by_classes[class_name]):
+            if _first_handles.get((instance_id, class_idx)) == _block_starts[block]:
+                instance = _instances[instance_id][0]()
+            else:
+                instance = None
+            return instance, f"{class_name}.{_inputs_by_classes[class_name][input_idx]}"
+    for fn, fn_handle in _free_inputs.items():
+        if fn_handle == handle:
+            return None, f"{fn.__module__}.{fn.__qualname__}"
+    raise SystemError(f"{handle} is not a port handle")
 
 def check() -> None:
     """Check that inputs are functions or correct class members, and all connected"""
-    all_input_fn = [qc+"."+fn for qc, fnlist in _inputs_by_classes.items() for fn in fnlist]
-    input_fn_outside_hwelem = set(all_input_fn) - set(_inputs_found_in_hwelem)
+    input_fn_outside_hwelem = {
+        qc+"."+fn for qc, fnlist in _inputs_by_classes.items()
+        if qc not in _hw_elem_classes for fn in fnlist
+    }
     if input_fn_outside_hwelem:
         raise SystemError(f"class(es) of @input method(s) {input_fn_outside_hwelem} missing @hw_elem")
 
-    not_connected = [k for k,v in filter(lambda i: not i[1], _inputs_connected.items())]
-    if not_connected:
+    if _not_connected_count:
+        not_connected = []
+        for handle in _not_connected_handles():
+            instance, name = port_owner(handle)
+            not_connected.append(name if instance is None else f"{name} of {instance!r}")
         raise SystemError(f"{not_connected} input(s) not connected")
+
+def _not_connected_handles() -> list[int]:
+    handle = _port_states.find(NOT_CONNECTED)
+    handles = []
+    while handle >= 0:
+        handles.append(handle)
+        handle = _port_states.find(NOT_CONNECTED, handle + 1)
+    return handles
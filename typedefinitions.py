@@ -14,26 +14,70 @@ from typing import Literal, Self
 
 
 class TTL(Enum):
+    """4-state logic level
+
+    X is unknown (e.g. a flip-flop after power on), Z is floating (not
+    driven). The operators look up their results in tables, a Z input is
+    read as X.
+    """
     L = 0
     H = 1
+    X = 2
+    Z = 3
 
     def __and__(self, other: Self) -> Self:
-        return self.__class__(self.value and other.value)
-    
+        return _AND[self._value_][other._value_]
+
     def __or__(self, other: Self) -> Self:
-        return self.__class__(self.value or other.value)
+        return _OR[self._value_][other._value_]
+
+    def __xor__(self, other: Self) -> Self:
+        return _XOR[self._value_][other._value_]
 
     def __invert__(self) -> Self:
-        return self.__class__(not self.value)
-    
+        return _INVERT[self._value_]
+
+    @property
+    def known(self) -> bool:
+        """Whether the level is L or H"""
+        return self._value_ < 2
+
     def to_volt(self) -> "Voltage":
-        return Voltage(0.3 + self.value*4.2)
+        return Voltage(_VOLTS[self._value_])
 
     # def bit(self) -> Bit:
     #     return Bit(self.value)
 
 
+# Operator results by the values of the operands
+_L, _H, _X = TTL.L, TTL.H, TTL.X
+_AND = (
+    (_L, _L, _L, _L),
+    (_L, _H, _X, _X),
+    (_L, _X, _X, _X),
+    (_L, _X, _X, _X),
+)
+_OR = (
+    (_L, _H, _X, _X),
+    (_H, _H, _H, _H),
+    (_X, _H, _X, _X),
+    (_X, _H, _X, _X),
+)
+_XOR = (
+    (_L, _H, _X, _X),
+    (_H, _L, _X, _X),
+    (_X, _X, _X, _X),
+    (_X, _X, _X, _X),
+)
+_INVERT = (_H, _L, _X, _X)
+
+# Voltage of the levels: X is between the input thresholds, Z does not drive
+_VOLTS = (0.3, 4.5, 1.4, 0.0)
+
+
 class Voltage:
+    __slots__ = ("level",)
+
     # The max diff between voltage values when we consider them the same
     VOLTAGE_TOLERANCE = 0.1
 
@@ -70,8 +114,16 @@ class Voltage:
                 abs_tol=self.VOLTAGE_TOLERANCE
             )
     
-    def __eq__(self, other: Self | float | int) -> bool:
+    def __ne__(self, other: Self | float | int) -> bool:
         return not self.__eq__(other)
 
+    # TTL input thresholds
+    LOW_MAX = 0.8
+    HIGH_MIN = 2.0
+
     def to_ttl(self) -> TTL:
-        return TTL(1 if self.level>2.5 else 0)
+        if self.level >= self.HIGH_MIN:
+            return TTL.H
+        if self.level <= self.LOW_MAX:
+            return TTL.L
+        return TTL.X